@@ -4,24 +4,34 @@ the reef boundaries datasets for the GBR and Torres Strait, as well as for the C
 West Australia. It also downloads bathymetry datasets to create a national bathymetry virtual dataset to
 estimate the depth of the reef features.
 
+The third party datasets are independent of each other and so are downloaded in parallel using a small
+thread pool. The downloads are network bound so overlapping them reduces the total download time to
+roughly that of the largest dataset.
+
 There is one additional dataset that is not downloaded by this script: the ESRI Country shapefile. This
 must be manually downloaded because it is available for direct download. See README.md for details.
 """
 from data_downloader import DataDownloader
+import config_loader
 
 import os
 import zipfile
 import csv
 import time
-import configparser
+import functools
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 from pyproj import CRS  # Add this import for the CRS class
 
 # Read configuration from config.ini
-config = configparser.ConfigParser()
-config.read('config.ini')
-download_path = config.get('general', 'in_3p_path')
-version = config.get('general', 'version')
+download_path = config_loader.in_3p_path()
+version = config_loader.version()
+
+# Number of datasets to download at the same time. Kept small to be polite to the
+# hosting servers, while still overlapping the large bathymetry downloads with the
+# smaller reef datasets.
+MAX_PARALLEL_DOWNLOADS = 4
 
 # Create an instance of the DataDownloader class
 downloader = DataDownloader(download_path=download_path)
@@ -30,16 +40,24 @@ print(" --------------------------------------------------------")
 print(f"Downloading source data files to {download_path}. This will take a while ...")
 
 # --------------------------------------------------------
+# Generate the WKT2 string for an EPSG code using pyproj. Cached as building the
+# CRS requires a lookup in the PROJ database, which only needs to happen once.
+@functools.lru_cache(maxsize=None)
+def _wkt2_epsg(epsg):
+    return CRS.from_epsg(epsg).to_wkt("WKT2_2019")
+
 # Function to replace the .prj file with WKT2 EPSG:4283
 def replace_prj_with_epsg_4283(shapefile_path):
     prj_file = os.path.splitext(shapefile_path)[0] + ".prj"
     print(f"Replacing .prj file at {prj_file} with EPSG:4283 WKT2...")
-    # Generate WKT2 string for EPSG:4283 using pyproj
-    wkt_content = CRS.from_epsg(4283).to_wkt("WKT2_2019")
-    with open(prj_file, "w") as f:
-        f.write(wkt_content)
+    Path(prj_file).write_text(_wkt2_epsg(4283))
     print(".prj file successfully replaced!")
 
+# Each of the third party downloads is submitted to the thread pool. The futures are
+# collected so that we can wait for them all to finish and report any failures.
+executor = ThreadPoolExecutor(max_workers=MAX_PARALLEL_DOWNLOADS)
+downloads = []
+
 # The dataset names in the data/in are kept short to prevent long paths causing issues in Windows.
 # --------------------------------------------------------
 # Australian Coastline 50K 2024 (NESP MaC 3.17, AIMS)
@@ -49,10 +67,12 @@ def replace_prj_with_epsg_4283(shapefile_path):
 
 # Use this version for overview maps
 direct_download_url = 'https://nextcloud.eatlas.org.au/s/DcGmpS3F5KZjgAG/download?path=%2FV1-1%2F&files=Simp'
-downloader.download_and_unzip(direct_download_url, 'Coastline50k', subfolder_name='Simp', flatten_directory=True)
+downloads.append(executor.submit(
+    downloader.download_and_unzip, direct_download_url, 'Coastline50k', subfolder_name='Simp', flatten_directory=True))
 
 direct_download_url = 'https://nextcloud.eatlas.org.au/s/DcGmpS3F5KZjgAG/download?path=%2FV1-1%2F&files=Split'
-downloader.download_and_unzip(direct_download_url, 'Coastline50k', subfolder_name='Split', flatten_directory=True)
+downloads.append(executor.submit(
+    downloader.download_and_unzip, direct_download_url, 'Coastline50k', subfolder_name='Split', flatten_directory=True))
 
 # REEF DATASETS
 
@@ -62,30 +82,37 @@ downloader.download_and_unzip(direct_download_url, 'Coastline50k', subfolder_nam
 # Science (AIMS), Torres Strait Regional Authority (TSRA), Great Barrier Reef Marine Park Authority [producer]. 
 # eAtlas Repository [distributor]. https://eatlas.org.au/data/uuid/d2396b2c-68d4-4f4b-aab0-52f7bc4a81f5
 direct_download_url = 'https://nextcloud.eatlas.org.au/s/xQ8neGxxCbgWGSd/download/TS_AIMS_NESP_Torres_Strait_Features_V1b_with_GBR_Features.zip'
-downloader.download_and_unzip(direct_download_url, 'TS-GBR-Feat')
 
-# Replace the .prj file for the GBR shapefile because it is using an older WKT format
-# that fails to load correctly in stages 3.
-gbr_shapefile = os.path.join(downloader.download_path, 'TS-GBR-Feat', 'TS_AIMS_NESP_Torres_Strait_Features_V1b_with_GBR_Features.shp')
-replace_prj_with_epsg_4283(gbr_shapefile)
+def download_ts_gbr_features(url):
+    downloader.download_and_unzip(url, 'TS-GBR-Feat')
+
+    # Replace the .prj file for the GBR shapefile because it is using an older WKT format
+    # that fails to load correctly in stages 3. This must run after the download completes.
+    gbr_shapefile = os.path.join(downloader.download_path, 'TS-GBR-Feat', 'TS_AIMS_NESP_Torres_Strait_Features_V1b_with_GBR_Features.shp')
+    replace_prj_with_epsg_4283(gbr_shapefile)
+
+downloads.append(executor.submit(download_ts_gbr_features, direct_download_url))
 
 # --------------------------------------------------------
 # Lawrey, E., Bycroft, R. (2025). Coral Sea Features - Dataset collection - Coral reefs, Cays, Oceanic 
 # reef atoll platforms, and Depth contours (AIMS). [Data set]. eAtlas. https://doi.org/10.26274/pgjp-8462
 # Reefs and Cays
 direct_download_url = 'https://nextcloud.eatlas.org.au/s/DcoZ33bMzeY5JaK/download?path=%2FReefs-Cays'
-downloader.download_and_unzip(direct_download_url, 'Coral-Sea-Feat', subfolder_name='Reefs-Cays', flatten_directory=True)
+downloads.append(executor.submit(
+    downloader.download_and_unzip, direct_download_url, 'Coral-Sea-Feat', subfolder_name='Reefs-Cays', flatten_directory=True))
 
 # Atoll Platforms
 direct_download_url = 'https://nextcloud.eatlas.org.au/s/DcoZ33bMzeY5JaK/download?path=%2FAtoll-Platforms'
-downloader.download_and_unzip(direct_download_url, 'Coral-Sea-Feat', subfolder_name='Atoll-Platforms', flatten_directory=True)
+downloads.append(executor.submit(
+    downloader.download_and_unzip, direct_download_url, 'Coral-Sea-Feat', subfolder_name='Atoll-Platforms', flatten_directory=True))
 
 # --------------------------------------------------------
 # Lawrey, E., Bycroft, R. (2025). North and West Australian Tropical Reef Features - Boundaries of coral reefs, 
 # rocky reefs, sand banks and intertidal zone (NESP-MaC 3.17, AIMS, Aerial Architecture). [Data set]. 
 # eAtlas. https://doi.org/10.26274/xj4v-2739
 direct_download_url = 'https://nextcloud.eatlas.org.au/s/ZbxtYci3A6WYnHc/download?path=%2Fv0-4'
-downloader.download_and_unzip(direct_download_url, 'NW-Aus-Feat_v0-4', flatten_directory=True)
+downloads.append(executor.submit(
+    downloader.download_and_unzip, direct_download_url, 'NW-Aus-Feat_v0-4', flatten_directory=True))
 
 
 # BATHYMETRY DATASETS
@@ -116,29 +143,39 @@ downloader.download_and_unzip(direct_download_url, 'NW-Aus-Feat_v0-4', flatten_d
 # Geoscience Australia. (2024).AusBathyTopo (Australia) 250m 2024 - A national-scale depth model (20240011C). 
 # https://doi.org/10.26186/150050
 direct_download_url = 'https://files.ausseabed.gov.au/survey/AusBathyTopo%20(Australia)%202024%20250m.zip'
-downloader.download_and_unzip(direct_download_url, 'AusBathyTopo-250m_2024')    
+downloads.append(executor.submit(downloader.download_and_unzip, direct_download_url, 'AusBathyTopo-250m_2024'))
 
 # --------------------------------------------------------
 # Flukes, E., (2024). Multi-resolution bathymetry composite surface for Australian waters (EEZ). 
 # Institute for Marine and Antarctic Studies (IMAS). Data accessed from 
 # https://metadata.imas.utas.edu.au/geonetwork/srv/eng/catalog.search#/metadata/69e9ac91-babe-47ed-8c37-0ef08f29338a 
 # on 31 July 2025
-# These are 22GB and 37 GB files so they will take a while to download.
+# These are 22GB and 37 GB files so they will take a while to download. They are each split
+# into multiple concurrent range requests to get past the throughput limit of a single stream.
+# Both files are downloaded at the same time and their range requests share the downloader's
+# pool of range workers and connections to the IMAS server.
 direct_download_url = 'https://data.imas.utas.edu.au/attachments/69e9ac91-babe-47ed-8c37-0ef08f29338a/bathymetry/01_shallow_bathy.tif'
-downloader.download_only(direct_download_url, 'MultiRes-Bathy-EEZ_2024') 
+downloads.append(executor.submit(downloader.download_only, direct_download_url, 'MultiRes-Bathy-EEZ_2024', num_parts=8))
 
 # We need to mesophotic bathymetry for 30-70m depth range as a lot of deeper reefs are in this range.
 direct_download_url = 'https://data.imas.utas.edu.au/attachments/69e9ac91-babe-47ed-8c37-0ef08f29338a/bathymetry/02_mesophotic_bathy.tif'
-downloader.download_only(direct_download_url, 'MultiRes-Bathy-EEZ_2024') 
+downloads.append(executor.submit(downloader.download_only, direct_download_url, 'MultiRes-Bathy-EEZ_2024', num_parts=8))
+
+# Wait for all the third party downloads to finish. Calling result() re-raises any
+# exception from the download thread so that failures are not silently ignored.
+for future in as_completed(downloads):
+    future.result()
+executor.shutdown()
 
 
 # --------------------------------------------------------
 # Download the input data associated with this dataset. This includes all the manual edits that will
 # be applied to the GBR and Torres Strait datasets.
-# Switch to downloading the in data associated with this dataset.
+# Switch to downloading the in data associated with this dataset. This must happen after
+# all the parallel downloads have finished as it changes the downloader.download_path.
 
 
-downloader.download_path = config.get('general', 'in_path')
+downloader.download_path = config_loader.in_path()
 
 # There is a risk that will overwrite any existing manually edited data. The script should however
 # skip if the in folder already exists.
@@ -153,6 +190,7 @@ if not os.path.exists(downloader.download_path):
     downloader.download_and_unzip(direct_download_url, flatten_directory=True)
 else:
     print(f"Input data folder {downloader.download_path} already exists. Skipping download to avoid overwriting any existing manually edited data.")
+downloader.close()
 # --------------------------------------------------------
 # Remind the user that they have to manually download the dataset.
 # We cannot download automatically.
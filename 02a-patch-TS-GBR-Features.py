@@ -49,26 +49,27 @@ Notes:
 - A limitation of this approach is that the reef allocation does not
  consider depth in the RB_Type_L3 classification.
 
-Output: working/02/TS-GBR-Features-patched.shp
+Output: working/02/TS-GBR-Features-patched.parquet
 
 Part of: NESP Marine and Coastal Hub Project 3.17
 """
 
 import geopandas as gpd
 import pandas as pd
+import numpy as np
 import os
 import sys
-import configparser
+import pyogrio
+import config_loader
+import shapely
+from shapely import STRtree
 from shapely.geometry import Point
-from shapely.ops import unary_union
 
 # Define version
 VERSION = "v0-1"
 
 # Read configuration from config.ini
-config = configparser.ConfigParser()
-config.read('config.ini')
-download_path = config.get('general', 'in_3p_path')
+download_path = config_loader.in_3p_path()
 
 # Define paths
 base_path = f"data/{VERSION}"
@@ -78,7 +79,75 @@ extra_features_path = os.path.join(base_path, "in", "Complete-GBR-ExtraFeatures.
 # rb_type_lut_path = os.path.join(base_path, "in", "RB_Type_L3_Classification.csv")
 rb_type_lut_path = os.path.join(download_path, "NW-Aus-Feat_v0-4", "in", "RB_Type_L3_crosswalk.csv")
 output_dir = "working/02"
-output_path = os.path.join(output_dir, "TS-GBR-Features-patched.shp")
+output_path = os.path.join(output_dir, "TS-GBR-Features-patched.parquet")
+
+# Attributes renamed in Step 5
+RENAME_COLUMNS = {
+    'IMG_SRC': 'EdgeSrc',
+    'QLD_NAME': 'Name',
+    'TRAD_NAME': 'OtherNames',
+    'LABEL_ID': 'ReefID'
+}
+
+# Unnecessary attributes removed from the output
+COLUMNS_TO_REMOVE = [
+    'TARGET_FID', 'LOC_NAME_S', 'GBR_NAME', 'CHART_NAME', 'TRAD_NAME', 
+    'UN_FEATURE', 'SORT_GBR_I', 'FEAT_NAME', 'LEVEL_1', 'LEVEL_2', 'LEVEL_3',
+    'CLASS_SRC', 'POLY_ORIG', 'SUB_NO', 'CODE', 'FEATURE_C', 'X_LABEL', 
+    'GBR_ID', 'LOC_NAME_L', 'X_COORD', 'Y_COORD', 'SHAPE_AREA', 'SHAPE_LEN',
+    'Checked', 'RegionID', 'LatitudeID', 'GroupID', 'UNIQUE_ID','PriorityLb','OtherNames',
+    'Name','Country'
+]
+
+# Edge accuracy (m) lookup tables by feature area (km^2). An area up to and including the
+# first threshold gets the first value, up to the second threshold the second value, etc.
+# FeatType-Override/ExtraFeatures table
+EXTRA_EDGE_ACC_THRESHOLDS = np.array([0.1, 1])
+EXTRA_EDGE_ACC_VALUES = np.array([50, 80, 150])
+# All other features table
+OTHER_EDGE_ACC_THRESHOLDS = np.array([0.1, 1, 10, 30])
+OTHER_EDGE_ACC_VALUES = np.array([150, 200, 300, 600, 800])
+
+# Attributes of TS-GBR-Features that are used in the processing, even though they
+# are removed from the output
+PROCESSING_COLUMNS = ['CODE', 'FEAT_NAME', 'LEVEL_1', 'LEVEL_3']
+
+# Processing attributes that are still needed after the datasets are merged in Step 4
+MERGE_COLUMNS = ['CODE', 'FEAT_NAME', 'LEVEL_3']
+
+def get_ts_gbr_read_columns(path):
+    """
+    Return the attributes of the TS-GBR-Features shapefile that need to be read. Attributes
+    that end up being removed from the output (directly or after renaming) and that aren't
+    used in the processing are skipped, so GDAL doesn't need to read them from the DBF.
+    """
+    fields = pyogrio.read_info(path)['fields']
+    return [field for field in fields
+            if field in PROCESSING_COLUMNS or is_output_column(field)]
+
+def is_output_column(column):
+    """
+    Return True if the attribute is kept in the output, once it has been renamed.
+    """
+    return RENAME_COLUMNS.get(column, column) not in COLUMNS_TO_REMOVE
+
+def select_merge_columns(features):
+    """
+    Return the features with only the attributes that are used after the merge, so that
+    the concat doesn't allocate columns that are only going to be removed at the end.
+    """
+    return features[[col for col in features.columns
+                     if col == 'geometry' or col in MERGE_COLUMNS or is_output_column(col)]]
+
+def format_sample(values, limit=5):
+    """
+    Format the first few values of a list for a summary message, rather than printing
+    a line for every value.
+    """
+    sample = ', '.join(str(v) for v in values[:limit])
+    if len(values) > limit:
+        sample += f", ... ({len(values) - limit} more)"
+    return sample
 
 def load_classification_lookup(csv_path):
     """
@@ -116,32 +185,32 @@ def load_classification_lookup(csv_path):
         print(f"Error loading classification lookup table: {e}")
         sys.exit(1)
 
-def map_feature_classification(classification_mapping, feat_name, level_3=None):
+def clean_classification(features, column):
+    """
+    Return the stripped values of a classification column, with empty strings
+    and missing values (or a missing column) as NA.
+    The column only has a few dozen distinct values, so it is converted to a category
+    and the string clean up is done once per category rather than for every feature.
+    """
+    if column not in features.columns:
+        return pd.Series(pd.NA, index=features.index, dtype='string')
+    values = features[column].astype('category').str.strip().astype('string')
+    return values.mask(values == '')
+
+def map_feature_classification(classification_mapping, feat_name, level_3):
     """
     Map feature classifications using the lookup table.
-    First tries LEVEL_3 if available, then falls back to FEAT_NAME.
+    Uses LEVEL_3 if available, otherwise FEAT_NAME. Note there is no fall back to
+    FEAT_NAME if a LEVEL_3 value has no mapping.
     Handles both direct RB_Type_L3 matches and alias matches.
+    :param feat_name: Cleaned FEAT_NAME values (see clean_classification)
+    :param level_3: Cleaned LEVEL_3 values (see clean_classification)
+    :return: (RB_Type_L3 Series, NA where unmapped; classification used; True where it came from LEVEL_3)
     """
-    # Determine the best classification to use
-    classification = None
-    source = None
-    
-    if pd.notna(level_3) and level_3.strip():
-        classification = level_3.strip()
-        source = "LEVEL_3"
-    elif pd.notna(feat_name) and feat_name.strip():
-        classification = feat_name.strip()
-        source = "FEAT_NAME"
-    else:
-        return None, "No valid classification found"
-    
-    # Look up the classification in the mapping
-    rb_type = classification_mapping.get(classification.lower())
-    
-    if rb_type is None:
-        return None, f"No mapping found for '{classification}' from {source}"
-    
-    return rb_type, source
+    use_level_3 = level_3.notna()
+    classification = level_3.where(use_level_3, feat_name)
+    rb_type = classification.astype('category').str.lower().map(classification_mapping).astype(object)
+    return rb_type, classification, use_level_3
 
 def main():
     print(f"Starting patching process for {VERSION}")
@@ -153,9 +222,10 @@ def main():
     # Load the datasets
     print("Loading datasets...")
     try:
-        ts_gbr_features = gpd.read_file(ts_gbr_path)
-        override_points = gpd.read_file(override_path)
-        extra_features = gpd.read_file(extra_features_path)
+        ts_gbr_features = gpd.read_file(ts_gbr_path, use_arrow=True,
+                                        columns=get_ts_gbr_read_columns(ts_gbr_path))
+        override_points = gpd.read_file(override_path, use_arrow=True)
+        extra_features = gpd.read_file(extra_features_path, use_arrow=True)
         classification_mapping = load_classification_lookup(rb_type_lut_path)
         # Ensure CRS is set (GDA94 EPSG:4283 if missing). GeoPandas
         # seems to not reliably set CRS automatically.
@@ -176,104 +246,145 @@ def main():
     
     # --- Save a copy of island/mainland features for later attachment calculation ---
     print("\nSaving island/mainland features for later attachment calculation...")
-    island_mainland_mask = ts_gbr_features['LEVEL_1'].isin(['Island', 'Mainland'])
+    # LEVEL_1 only has a handful of distinct values, so as a category the isin tests
+    # below compare integer codes rather than strings.
+    level_1 = ts_gbr_features['LEVEL_1'].astype('category')
+    island_mainland_mask = level_1.isin(['Island', 'Mainland'])
     islands_mainland = ts_gbr_features[island_mainland_mask].copy()
     
     # Remove features with LEVEL_1='Island', 'Mainland', 'Other' early in the process
     print("\nRemoving features with LEVEL_1='Island', 'Mainland', or 'Other'...")
     original_count = len(ts_gbr_features)
-    ts_gbr_features = ts_gbr_features[~ts_gbr_features['LEVEL_1'].isin(['Island', 'Mainland', 'Other'])]
+    ts_gbr_features = ts_gbr_features[~level_1.isin(['Island', 'Mainland', 'Other'])]
     removed_count = original_count - len(ts_gbr_features)
     print(f"  Removed {removed_count} features with LEVEL_1='Island', 'Mainland', or 'Other'")
     
     # Check for duplicate CODEs in TS-GBR-Features - but only warn, don't exit
     print("\nChecking for duplicate CODEs in TS-GBR-Features...")
-    code_counts = ts_gbr_features['CODE'].value_counts()
-    duplicate_codes = code_counts[code_counts > 1]
-    if not duplicate_codes.empty:
-        print(f"WARNING: Found duplicate CODEs in TS-GBR-Features: {duplicate_codes.index.tolist()}")
+    codes = ts_gbr_features['CODE']
+    dup_mask = codes.duplicated(keep=False) & codes.notna()
+    if dup_mask.any():
+        duplicate_codes = codes[dup_mask].unique()
+        print(f"WARNING: Found duplicate CODEs in TS-GBR-Features: {duplicate_codes.tolist()}")
         print(f"These are likely multi-part features that have been split. Using first instance for each.")
     
     # Step 1: Copy attributes from TS-GBR-Features to ExtraFeatures based on CODE
     print("\nStep 1: Copying attributes from TS-GBR-Features to ExtraFeatures...")
-    # Create a dictionary of CODE to attributes from ts_gbr_features
+    # Table of attributes by CODE from ts_gbr_features, excluding geometry and FEAT_NAME.
     # For duplicates, this will use the first occurrence of each CODE
-    ts_gbr_dict = {}
-    for _, row in ts_gbr_features.iterrows():
-        if pd.notna(row['CODE']) and row['CODE'] not in ts_gbr_dict:
-            ts_gbr_dict[row['CODE']] = row
-    
-    # Create a copy of extra_features to hold the updated data
-    extra_features_with_attrs = extra_features.copy()
-    
-    # List to store extra features with no matching CODE
-    no_match_codes = []
-    
-    # Copy attributes from ts_gbr_features to extra_features_with_attrs
-    for idx, row in extra_features_with_attrs.iterrows():
-        code = row['CODE']
-        if pd.notna(code) and code in ts_gbr_dict:
-            print(f"  Copying attributes for ExtraFeature with CODE {code}")
-            # Copy all attributes except geometry and FEAT_NAME
-            for col in ts_gbr_features.columns:
-                if col not in ['geometry', 'FEAT_NAME']:
-                    extra_features_with_attrs.at[idx, col] = ts_gbr_dict[code][col]
-        elif pd.notna(code):  # Only report if CODE is not empty/null
-            no_match_codes.append(code)
-            print(f"  No matching CODE {code} found in TS-GBR-Features")
+    ts_gbr_attrs = (ts_gbr_features.dropna(subset=['CODE'])
+                    .drop_duplicates('CODE')
+                    .drop(columns=['geometry', 'FEAT_NAME'])
+                    .set_index('CODE', drop=False))
+    
+    extra_codes = extra_features['CODE']
+    has_match = extra_codes.isin(ts_gbr_attrs.index)
+    matched_codes = extra_codes[has_match].tolist()
+    # List of extra features with no matching CODE (only reported if CODE is not empty/null)
+    no_match_codes = extra_codes[~has_match & pd.notna(extra_codes)].tolist()
+    if matched_codes:
+        print(f"  Copying attributes for {len(matched_codes)} ExtraFeatures with CODEs: "
+              f"{format_sample(matched_codes)}")
+    
+    # Copy all the attributes in one lookup on CODE. Only the matched rows are written,
+    # so features without a match keep their own values for any attributes they already
+    # have, and integer attributes aren't turned into floats by NaN padding. assign()
+    # returns a new frame with the updated columns, without first making a deep copy
+    # of extra_features.
+    extra_features_with_attrs = extra_features
+    if has_match.any():
+        matched_attrs = ts_gbr_attrs.loc[extra_codes[has_match]]
+        copied_columns = {}
+        for col in ts_gbr_attrs.columns:
+            matched_values = matched_attrs[col].to_numpy()
+            if has_match.all():
+                # Every feature has a match, so the column takes the source dtype
+                copied_columns[col] = pd.Series(matched_values, index=extra_features.index)
+                continue
+            if col in extra_features.columns:
+                values = extra_features[col].copy()
+                values.loc[has_match] = matched_values
+            else:
+                # New columns are padded with None for the unmatched features. Integer
+                # and boolean attributes are left as objects, as NaN would make them floats.
+                values = pd.Series(np.full(len(extra_features), None, dtype=object),
+                                   index=extra_features.index)
+                values.loc[has_match] = matched_values
+                if ts_gbr_attrs[col].dtype.kind not in 'iub':
+                    values = values.astype(ts_gbr_attrs[col].dtype)
+            copied_columns[col] = values
+        extra_features_with_attrs = extra_features.assign(**copied_columns)
     
     if no_match_codes:
-        print(f"WARNING: {len(no_match_codes)} ExtraFeature records with no matching CODE in TS-GBR-Features")
+        print(f"WARNING: {len(no_match_codes)} ExtraFeature records with no matching CODE in TS-GBR-Features: "
+              f"{format_sample(no_match_codes)}")
     
     # Step 2: Determine spatial matches between Override points and TS-GBR-Features
     print("\nStep 2: Finding spatial matches between Override points and TS-GBR-Features...")
     # Dictionary to track which features are affected by overrides
     affected_features = {}
     
-    # Create a spatial index for ts_gbr_features to speed up spatial queries
-    ts_gbr_sindex = ts_gbr_features.sindex
-    
-    # Identify features that intersect with override points
-    for idx, override_point in override_points.iterrows():
-        point_geom = override_point.geometry
-        
-        # Use spatial index to find potential matches
-        possible_matches_idx = list(ts_gbr_sindex.intersection(point_geom.bounds))
-        possible_matches = ts_gbr_features.iloc[possible_matches_idx]
-        
-        # Refine to exact matches
-        matches = possible_matches[possible_matches.contains(point_geom)]
-        
-        if len(matches) == 0:
-            print(f"WARNING: Override point {idx} (type: {override_point['FEAT_NAME']}) does not intersect any feature")
+    # Find the features containing each override point with a single bulk query of the
+    # spatial index. The matches for each point are returned in the same order as a
+    # query for that point alone, so the 'first match' used below is unchanged.
+    point_positions, feature_positions = ts_gbr_features.sindex.query(override_points.geometry)
+    # Refine the bounding box candidates with an exact contains test. The candidate
+    # polygons are prepared first so their edges are indexed once and reused for every
+    # point tested against them.
+    ts_gbr_geoms = ts_gbr_features.geometry.values
+    shapely.prepare(ts_gbr_geoms[np.unique(feature_positions)])
+    contained = shapely.contains(ts_gbr_geoms[feature_positions],
+                                 override_points.geometry.values[point_positions])
+    point_positions, feature_positions = point_positions[contained], feature_positions[contained]
+    match_counts = np.bincount(point_positions, minlength=len(override_points))
+    matched_points, first_match = np.unique(point_positions, return_index=True)
+    first_feature_position = dict(zip(matched_points, feature_positions[first_match]))
+    
+    # FEAT_NAME updates for 'Bank' and 'Rock' overrides, applied in one assignment
+    feat_name_updates = {}
+    # CODEs affected by more than one override with the same action
+    repeated_overrides = []
+    
+    # Check the overrides in order so that conflicts are reported as before
+    for point_position, (idx, override_type) in enumerate(
+            zip(override_points.index, override_points['FEAT_NAME'])):
+        if match_counts[point_position] == 0:
+            print(f"WARNING: Override point {idx} (type: {override_type}) does not intersect any feature")
             continue
         
-        if len(matches) > 1:
+        if match_counts[point_position] > 1:
             print(f"WARNING: Override point {idx} intersects multiple features. Using the first match.")
         
         # Get the first (or only) match
-        match_idx = matches.index[0]
-        match_code = matches.at[match_idx, 'CODE']
+        match_position = first_feature_position[point_position]
+        match_idx = ts_gbr_features.index[match_position]
+        match_code = ts_gbr_features['CODE'].iat[match_position]
         
         # Check if this feature has already been affected by an override
         if match_code in affected_features:
             # Allow multiple overrides with the same action on the same CODE
             # (This happens when a feature is split into multiple parts with the same CODE)
-            if affected_features[match_code] == override_point['FEAT_NAME']:
-                print(f"Note: Multiple {override_point['FEAT_NAME']} overrides affecting feature with CODE {match_code}")
+            if affected_features[match_code] == override_type:
+                repeated_overrides.append(f"{match_code} ({override_type})")
             else:
                 # Still an error if different actions are trying to affect the same CODE
                 print(f"ERROR: Feature with CODE {match_code} is affected by conflicting overrides: "
-                      f"{affected_features[match_code]} and {override_point['FEAT_NAME']}")
+                      f"{affected_features[match_code]} and {override_type}")
                 sys.exit(1)
         
         # Record this override
-        affected_features[match_code] = override_point['FEAT_NAME']
+        affected_features[match_code] = override_type
         
         # For 'Bank' and 'Rock' overrides, update the FEAT_NAME
-        if override_point['FEAT_NAME'] in ['Bank', 'Rock']:
-            print(f"  Updating FEAT_NAME to {override_point['FEAT_NAME']} for feature with CODE {match_code}")
-            ts_gbr_features.loc[match_idx, 'FEAT_NAME'] = override_point['FEAT_NAME']
+        if override_type in ['Bank', 'Rock']:
+            feat_name_updates[match_idx] = override_type
+    
+    if repeated_overrides:
+        print(f"Note: Multiple overrides with the same action affecting {len(repeated_overrides)} features: "
+              f"{format_sample(repeated_overrides)}")
+    if feat_name_updates:
+        print(f"  Updating FEAT_NAME to Bank or Rock for {len(feat_name_updates)} features")
+        ts_gbr_features.loc[list(feat_name_updates), 'FEAT_NAME'] = list(feat_name_updates.values())
     
     # Step 3: Remove features that match with 'Merge', 'Move', 'Remove', 'Reshape' overrides
     print("\nStep 3: Removing features as specified by the overrides...")
@@ -282,8 +393,7 @@ def main():
     
     if removal_codes:
         print(f"  Removing {len(removal_codes)} features with actions: Merge, Move, Remove, Reshape")
-        for code in removal_codes:
-            print(f"  - Removing feature with CODE {code} (action: {affected_features[code]})")
+        print(f"  CODEs removed: {format_sample([f'{code} ({affected_features[code]})' for code in removal_codes])}")
         
         # Create a copy before filtering to report correct counts
         original_count = len(ts_gbr_features)
@@ -303,95 +413,80 @@ def main():
         ts_gbr_features = ts_gbr_features.rename(columns={'DATASET': 'Dataset'})
     # Set Dataset for added features
     valid_extra_features['Dataset'] = 'Aus-Trop-Reef-Features_v0-1'
-    merged_features = gpd.GeoDataFrame(pd.concat([ts_gbr_features, valid_extra_features], ignore_index=True))
+    merged_features = gpd.GeoDataFrame(pd.concat([select_merge_columns(ts_gbr_features),
+                                                  select_merge_columns(valid_extra_features)],
+                                                 ignore_index=True))
+    # Features added from ExtraFeatures (those after the original ts_gbr_features). The
+    # merged index is a RangeIndex, so this mask is reused by all the following steps.
+    is_extra = np.arange(len(merged_features)) >= len(ts_gbr_features)
 
     # Add FeatConf and TypeConf: 'High' if override or extra feature, else None
     print("\nAssigning 'FeatConf' and 'TypeConf' attributes based on override or extra feature status...")
     # Get set of override CODEs
     override_codes = set(affected_features.keys())
-    # Indices of extra features (those after the original ts_gbr_features)
-    extra_feature_indices = set(merged_features.index[merged_features.index >= len(ts_gbr_features)])
-    # Indices of features with override (by CODE)
-    override_indices = set(idx for idx, row in merged_features.iterrows() if pd.notna(row.get('CODE')) and row.get('CODE') in override_codes)
-    # Union of all indices to set as 'High'
-    high_conf_indices = override_indices | extra_feature_indices
+    # Features with override (by CODE)
+    codes = merged_features['CODE']
+    is_override = (pd.notna(codes) & codes.isin(override_codes)).to_numpy()
+    # Union of all features to set as 'High'
+    high_conf = is_extra | is_override
 
     # Set FeatConf and TypeConf
-    merged_features['FeatConf'] = None
-    merged_features['TypeConf'] = merged_features.get('TypeConf', None)
-    for idx in high_conf_indices:
-        merged_features.at[idx, 'FeatConf'] = 'High'
-        merged_features.at[idx, 'TypeConf'] = 'High'
+    merged_features['FeatConf'] = np.where(high_conf, 'High', None)
+    if 'TypeConf' in merged_features.columns:
+        type_conf = merged_features['TypeConf'].astype(object)
+    else:
+        type_conf = pd.Series(None, index=merged_features.index, dtype=object)
+    merged_features['TypeConf'] = type_conf.where(~high_conf, 'High')
 
     # --- Attachment assignment step (after merging) ---
     print("\nAssigning 'Attachment' attribute (Fringing/Isolated) to merged features...")
-    # Project to EPSG:3577 for buffering
+    # Project to EPSG:3577 for buffering. Only the geometry is projected, and it is kept
+    # for the area calculation below. The features themselves stay in their original
+    # CRS, as the Attachment value doesn't depend on the CRS.
     orig_crs = merged_features.crs
     if orig_crs is None or orig_crs.to_string() != "EPSG:3577":
         print("  Reprojecting merged features and islands/mainland to EPSG:3577 for buffering...")
-        merged_features_3577 = merged_features.to_crs(epsg=3577)
+        merged_geoms_3577 = merged_features.geometry.to_crs(epsg=3577)
         islands_mainland_3577 = islands_mainland.to_crs(epsg=3577)
     else:
-        merged_features_3577 = merged_features
+        merged_geoms_3577 = merged_features.geometry
         islands_mainland_3577 = islands_mainland
 
     # Buffer islands/mainland by 200m
     print("  Buffering island/mainland features by 200m...")
-    from shapely.ops import unary_union
-    buffer_union = unary_union(islands_mainland_3577.buffer(200))
+    # Index the individual buffers with an STRtree rather than dissolving them into one
+    # large multipolygon, so each feature is only tested against nearby islands.
+    buffer_tree = STRtree(islands_mainland_3577.buffer(200).values)
 
     # Assign Attachment
     print("  Assigning 'Attachment' values...")
-    def attachment_func(geom, idx):
-        if geom is None:
-            print(f"ERROR: Feature at index {idx} has geometry=None.")
-            print("Use QGIS Attribute Table > Select by Expression > is_empty($geometry) OR $geometry IS NULL")
-            raise ValueError(f"Feature at index {idx} has geometry=None")
-        return 'Fringing' if geom.intersects(buffer_union) else 'Isolated'
-    # Use enumerate to provide index for debugging
-    merged_features_3577['Attachment'] = [
-        attachment_func(geom, idx) for idx, geom in enumerate(merged_features_3577.geometry)
-    ]
-
-    # Restore CRS if needed
-    if orig_crs is None or orig_crs.to_string() != "EPSG:3577":
-        merged_features = merged_features_3577.to_crs(orig_crs)
-    else:
-        merged_features = merged_features_3577
+    geoms = merged_geoms_3577.values
+    null_geoms = np.flatnonzero(shapely.is_missing(geoms))
+    if len(null_geoms) > 0:
+        idx = null_geoms[0]
+        print(f"ERROR: Feature at index {idx} has geometry=None.")
+        print("Use QGIS Attribute Table > Select by Expression > is_empty($geometry) OR $geometry IS NULL")
+        raise ValueError(f"Feature at index {idx} has geometry=None")
+    # Features that intersect any buffered island/mainland are Fringing
+    feature_hits, _ = buffer_tree.query(geoms, predicate='intersects')
+    fringing_mask = np.zeros(len(geoms), dtype=bool)
+    fringing_mask[feature_hits] = True
+    merged_features['Attachment'] = np.where(fringing_mask, 'Fringing', 'Isolated')
 
     # --- EdgeAcc_m assignment step ---
     print("\nAssigning 'EdgeAcc_m' attribute based on feature area and source...")
 
-    # Calculate area in km^2 for each feature (project to EPSG:3577 for area calculation)
-    merged_features_area = merged_features.to_crs(epsg=3577).geometry.area / 1e6  # m^2 to km^2
-
-    # Identify features added from ExtraFeatures (those after the original ts_gbr_features)
-    extra_feature_mask = merged_features.index >= len(ts_gbr_features)
-    edge_acc_values = []
-
-    for idx, area_km2 in enumerate(merged_features_area):
-        is_extra = extra_feature_mask[idx]
-        if is_extra:
-            # FeatType-Override/ExtraFeatures table
-            if area_km2 > 1:
-                edge_acc = 150
-            elif area_km2 > 0.1:
-                edge_acc = 80
-            else:
-                edge_acc = 50
-        else:
-            # All other features table
-            if area_km2 > 30:
-                edge_acc = 800
-            elif area_km2 > 10:
-                edge_acc = 600
-            elif area_km2 > 1:
-                edge_acc = 300
-            elif area_km2 > 0.1:
-                edge_acc = 200
-            else:
-                edge_acc = 150
-        edge_acc_values.append(edge_acc)
+    # Calculate area in km^2 for each feature (using the EPSG:3577 geometry from above)
+    merged_features_area = merged_geoms_3577.area / 1e6  # m^2 to km^2
+
+    # Look up the edge accuracy from the area thresholds of each table. searchsorted on the
+    # left side gives the number of thresholds the area is strictly greater than.
+    areas = merged_features_area.to_numpy()
+    # FeatType-Override/ExtraFeatures table
+    extra_edge_acc = EXTRA_EDGE_ACC_VALUES[np.searchsorted(EXTRA_EDGE_ACC_THRESHOLDS, areas, side='left')]
+    # All other features table
+    other_edge_acc = OTHER_EDGE_ACC_VALUES[np.searchsorted(OTHER_EDGE_ACC_THRESHOLDS, areas, side='left')]
+    edge_acc_values = np.where(is_extra, extra_edge_acc, other_edge_acc)
 
     merged_features['EdgeAcc_m'] = edge_acc_values
 
@@ -400,12 +495,7 @@ def main():
     
     # Rename attributes in merged features
     print("  Renaming attributes...")
-    merged_features = merged_features.rename(columns={
-        'IMG_SRC': 'EdgeSrc',
-        'QLD_NAME': 'Name',
-        'TRAD_NAME': 'OtherNames',
-        'LABEL_ID': 'ReefID'
-    })
+    merged_features = merged_features.rename(columns=RENAME_COLUMNS)
     
     # Set TypeConf from CLASS_CONF where CLASS_CONF is not null
     if 'CLASS_CONF' in merged_features.columns:
@@ -414,19 +504,15 @@ def main():
     
     # Set EdgeSrc for features from ExtraFeatures to 'S2 All Tide'
     print("  Setting EdgeSrc for added features...")
-    # Identify rows from extra_features by checking their indices against the original dataframe
-    extra_feature_indices = merged_features.index[merged_features.index >= len(ts_gbr_features)]
-    merged_features.loc[extra_feature_indices, 'EdgeSrc'] = 'S2 All Tide'
+    merged_features.loc[is_extra, 'EdgeSrc'] = 'S2 All Tide'
     
     # Add OrigType attribute to preserve the most detailed original type
     print("  Adding OrigType attribute...")
-    merged_features['OrigType'] = None
-    
-    for idx, row in merged_features.iterrows():
-        if pd.notna(row.get('LEVEL_3')) and row.get('LEVEL_3').strip():
-            merged_features.at[idx, 'OrigType'] = row['LEVEL_3'].strip()
-        elif pd.notna(row.get('FEAT_NAME')) and row.get('FEAT_NAME').strip():
-            merged_features.at[idx, 'OrigType'] = row['FEAT_NAME'].strip()
+    # The cleaned LEVEL_3 and FEAT_NAME values are also used for the classification mapping
+    level_3 = clean_classification(merged_features, 'LEVEL_3')
+    feat_name = clean_classification(merged_features, 'FEAT_NAME')
+    orig_type = level_3.where(level_3.notna(), feat_name).astype(object)
+    merged_features['OrigType'] = orig_type.where(orig_type.notna(), None)
     
     # Apply classification mapping
     print("  Applying classification mapping...")
@@ -434,29 +520,22 @@ def main():
     if 'RB_Type_L3' not in merged_features.columns:
         merged_features['RB_Type_L3'] = None
     
+    # Apply mapping to all features
+    rb_type, classification, from_level_3 = map_feature_classification(
+        classification_mapping, feat_name, level_3
+    )
+    mapped = rb_type.notna()
+    merged_features['RB_Type_L3'] = rb_type.where(mapped, merged_features['RB_Type_L3'])
+    
     # Track unmapped classifications for reporting
     unmapped = {}
-    
-    # Apply mapping to each feature
-    for idx, row in merged_features.iterrows():
-        rb_type, source = map_feature_classification(
-            classification_mapping, 
-            row.get('FEAT_NAME'), 
-            row.get('LEVEL_3')
-        )
-        
-        if rb_type is not None:
-            merged_features.at[idx, 'RB_Type_L3'] = rb_type
+    for idx in merged_features.index[~mapped]:
+        if pd.isna(classification[idx]):
+            unmapped.setdefault("No valid classification found", set()).add("Empty or NULL value")
         else:
-            # Track unmapped classifications for reporting
-            if source not in unmapped:
-                unmapped[source] = set()
-            
-            if "No valid classification" in source:
-                unmapped[source].add("Empty or NULL value")
-            else:
-                classification = row.get('LEVEL_3') if "LEVEL_3" in source else row.get('FEAT_NAME')
-                unmapped[source].add(classification)
+            source = "LEVEL_3" if from_level_3[idx] else "FEAT_NAME"
+            unmapped.setdefault(f"No mapping found for '{classification[idx]}' from {source}", set()).add(
+                merged_features.at[idx, source])
     
     # Report unmapped classifications
     if unmapped:
@@ -473,16 +552,8 @@ def main():
     
     # Remove unnecessary attributes
     print("\nRemoving unnecessary attributes...")
-    columns_to_remove = [
-        'TARGET_FID', 'LOC_NAME_S', 'GBR_NAME', 'CHART_NAME', 'TRAD_NAME', 
-        'UN_FEATURE', 'SORT_GBR_I', 'FEAT_NAME', 'LEVEL_1', 'LEVEL_2', 'LEVEL_3',
-        'CLASS_SRC', 'POLY_ORIG', 'SUB_NO', 'CODE', 'FEATURE_C', 'X_LABEL', 
-        'GBR_ID', 'LOC_NAME_L', 'X_COORD', 'Y_COORD', 'SHAPE_AREA', 'SHAPE_LEN',
-        'Checked', 'RegionID', 'LatitudeID', 'GroupID', 'UNIQUE_ID','PriorityLb','OtherNames',
-        'Name','Country'
-    ]
     # Do not remove 'Attachment' or 'Dataset'
-    columns_to_remove = [col for col in columns_to_remove if col in merged_features.columns and col not in ['Dataset', 'Attachment']]
+    columns_to_remove = [col for col in COLUMNS_TO_REMOVE if col in merged_features.columns and col not in ['Dataset', 'Attachment']]
     if columns_to_remove:
         print(f"  Removing {len(columns_to_remove)} unnecessary attributes")
         merged_features = merged_features.drop(columns=columns_to_remove)
@@ -490,7 +561,8 @@ def main():
 
     # Save the result
     print(f"\nSaving {len(merged_features)} features to {output_path}")
-    merged_features.to_file(output_path)
+    # The output is only read by the merge script, so it is saved as GeoParquet
+    merged_features.to_parquet(output_path)
     
     print("Patching process completed successfully")
 
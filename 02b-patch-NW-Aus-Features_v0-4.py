@@ -8,35 +8,43 @@ a copy of 'RB_Type_L3'.
 
 """
 import os
-import configparser
+import config_loader
+from file_utils import is_up_to_date
 import shutil
 import glob
 import geopandas as gpd
+import pyogrio
 
 def main(perform_clipping=False):
     # Read configuration
-    config = configparser.ConfigParser()
-    config.read('config.ini')
-    in_3p_path = config['general']['in_3p_path']
+    in_3p_path = config_loader.in_3p_path()
     
     # Define paths
     input_file = os.path.join(in_3p_path, 'NW-Aus-Feat_v0-4', 'out', 
                              'AU_NESP-MaC-3-17_AIMS_NW-Aus-Features_v0-4.shp')
     output_dir = 'working/02'
-    output_file = os.path.join(output_dir, 'NW-Aus-Features-patched.shp')
+    output_file = os.path.join(output_dir, 'NW-Aus-Features-patched.parquet')
+    
+    if is_up_to_date(output_file, [input_file], __file__):
+        print(f"{output_file} is newer than its input, skipping. Delete it to force a rerun.")
+        return
     
     # Create output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    print(f"Reading {input_file}")
-    # Read the shapefile using geopandas
-    gdf = gpd.read_file(input_file)
-
     # Retain only the specified columns (plus geometry)
     columns_to_keep = [
         'EdgeSrc', 'EdgeAcc_m', 'FeatConf', 'TypeConf',
         'DepthCat', 'DepthCatSr', 'RB_Type_L3', 'Attachment'
     ]
+
+    print(f"Reading {input_file}")
+    # Read the shapefile using geopandas. Only the retained columns are read, so the
+    # other attributes are never loaded from the DBF.
+    input_fields = pyogrio.read_info(input_file)['fields']
+    gdf = gpd.read_file(input_file, use_arrow=True,
+                        columns=[col for col in columns_to_keep if col in input_fields])
+
     columns_to_keep_with_geom = [col for col in columns_to_keep if col in gdf.columns]
     if 'geometry' in gdf.columns:
         columns_to_keep_with_geom.append('geometry')
@@ -55,9 +63,10 @@ def main(perform_clipping=False):
     gdf['Dataset'] = 'NW-Aus-Features_v0-4'
     print("Added 'Dataset' attribute set to 'NW-Aus-Features_v0-4'")
 
-    # Save the modified shapefile
+    # Save the modified features
     print(f"Saving to {output_file}")
-    gdf.to_file(output_file)
+    # The output is only read by the merge script, so it is saved as GeoParquet
+    gdf.to_parquet(output_file)
     
     print("Patching complete.")
 
@@ -12,19 +12,21 @@ Patches the Coral Sea Features shapefile by:
 
 import os
 import geopandas as gpd
-import configparser
+import config_loader
 from pathlib import Path
 import pandas as pd
+import numpy as np
+import shapely
 
 # --- File path constants (set after config is loaded) ---
-CONFIG_PATH = 'config.ini'
 OUTPUT_DIR = 'working/02'
-OUTPUT_FILENAME = 'CS-Features-patched.shp'
+OUTPUT_FILENAME = 'CS-Features-patched.parquet'
+
+# RB_Type_L3 (v0-4) values that are given an Attachment of 'Land', rather than 'Oceanic'
+LAND_TYPES = frozenset({'Vegetated Cay', 'Unvegetated Cay'})
 
 def get_filepaths():
-    config = configparser.ConfigParser()
-    config.read(CONFIG_PATH)
-    in_3p_path = config.get('general', 'in_3p_path')
+    in_3p_path = config_loader.in_3p_path()
     cs_reefs_features_path = os.path.join(
         in_3p_path, 'Coral-Sea-Feat/Reefs-Cays/CS_AIMS_Coral-Sea-Features_2025_Reefs-cays.shp'
     )
@@ -76,12 +78,11 @@ def load_rb_type_crosswalk(csv_path):
     """
     print(f"Loading RB_Type_L3 crosswalk from {csv_path}")
     df = pd.read_csv(csv_path)
-    lut = {}
-    for _, row in df.iterrows():
-        k = str(row['RB_Type_L3_v0-3']).strip()
-        v = str(row['RB_Type_L3_v0-4']).strip()
-        if k:
-            lut[k] = v
+    # Each cell is converted with str(), like the RB_Type_L3 values that are looked up
+    keys = df['RB_Type_L3_v0-3'].map(str).str.strip()
+    values = df['RB_Type_L3_v0-4'].map(str).str.strip()
+    non_empty = keys != ''
+    lut = dict(zip(keys[non_empty], values[non_empty]))
     print(f"Loaded {len(lut)} RB_Type_L3 v0-3 to v0-4 mappings")
     return lut
 
@@ -91,8 +92,8 @@ def main():
 
     print("Reading Coral Sea Features shapefiles...")
     # Read input shapefiles
-    cs_reefs_gdf = gpd.read_file(cs_reefs_features_path)
-    cs_platforms_gdf = gpd.read_file(cs_platforms_features_path)
+    cs_reefs_gdf = gpd.read_file(cs_reefs_features_path, use_arrow=True)
+    cs_platforms_gdf = gpd.read_file(cs_platforms_features_path, use_arrow=True)
     
     # Process both datasets
     cs_reefs_gdf = process_features(cs_reefs_gdf, "Reefs and Cays")
@@ -108,9 +109,16 @@ def main():
     # Create a unified geometry of all reefs
     all_reefs_geometry = cs_reefs_gdf.union_all()
     
-    # Remove reef areas from each atoll platform
-    cs_platforms_gdf['geometry'] = cs_platforms_gdf.geometry.apply(
-        lambda geom: geom.difference(all_reefs_geometry)
+    # The reef union is used against every platform, so it is prepared once. This speeds
+    # up the intersects test that finds the platforms that actually overlap a reef.
+    # Shapely only uses a prepared geometry when it is the first argument.
+    shapely.prepare(all_reefs_geometry)
+    overlaps_reef = shapely.intersects(all_reefs_geometry, cs_platforms_gdf.geometry.to_numpy())
+    
+    # Remove reef areas from the overlapping atoll platforms in a single vectorised
+    # difference. Platforms that don't touch any reef are left unchanged.
+    cs_platforms_gdf.loc[overlaps_reef, 'geometry'] = (
+        cs_platforms_gdf.geometry[overlaps_reef].difference(all_reefs_geometry)
     )
     
     # Remove any atoll platforms that became empty after the difference operation
@@ -137,22 +145,17 @@ def main():
     merged_gdf['OrigType'] = merged_gdf['RB_Type_L3']
 
     # Map RB_Type_L3 using crosswalk, raise if not found
-    def map_rb_type(val):
-        key = str(val).strip()
-        if key in rb_type_lut:
-            return rb_type_lut[key]
-        else:
-            raise Exception(f"RB_Type_L3 value '{val}' not found in crosswalk table.")
+    keys = merged_gdf['RB_Type_L3'].astype(str).str.strip()
+    mapped = keys.map(rb_type_lut)
+    missing = mapped.isna()
+    if missing.any():
+        val = merged_gdf['RB_Type_L3'][missing].iloc[0]
+        raise Exception(f"RB_Type_L3 value '{val}' not found in crosswalk table.")
 
-    merged_gdf['RB_Type_L3'] = merged_gdf['RB_Type_L3'].apply(map_rb_type)
+    merged_gdf['RB_Type_L3'] = mapped
 
     # --- Add Attachment attribute ---
-    def attachment_value(rb_type):
-        if rb_type in ['Vegetated Cay', 'Unvegetated Cay']:
-            return 'Land'
-        else:
-            return 'Oceanic'
-    merged_gdf['Attachment'] = merged_gdf['RB_Type_L3'].apply(attachment_value)
+    merged_gdf['Attachment'] = np.where(merged_gdf['RB_Type_L3'].isin(LAND_TYPES), 'Land', 'Oceanic')
 
     # Reproject to EPSG:4283 before saving
     print("Reprojecting output to EPSG:4283...")
@@ -161,9 +164,10 @@ def main():
     # Create output directory if it doesn't exist
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    # Save the patched shapefile
-    print(f"Saving patched shapefile to: {output_path}")
-    merged_gdf.to_file(output_path)
+    # Save the patched features
+    print(f"Saving patched features to: {output_path}")
+    # The output is only read by the merge script, so it is saved as GeoParquet
+    merged_gdf.to_parquet(output_path)
     print("Patching completed successfully.")
 
 if __name__ == "__main__":
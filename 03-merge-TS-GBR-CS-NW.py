@@ -1,31 +1,41 @@
 #!/usr/bin/env python
 """
-Merges three shapefiles (CS-Features, TS-GBR-Features, NW-Aus-Features) into one output shapefile.
-All shapefiles are in EPSG:4283. The resulting shapefile has attributes corresponding to the 
-superset of the attributes from the input shapefiles.
+Merges three datasets (CS-Features, TS-GBR-Features, NW-Aus-Features) into one output GeoPackage.
+All datasets are in EPSG:4283. The resulting GeoPackage has attributes corresponding to the 
+superset of the attributes from the input datasets.
+
+The inputs and output are intermediate files. The patched datasets in working/02 are
+GeoParquet files, as they are only read by this script, and the merged output in
+working/03 is saved as a single file GeoPackage rather than a shapefile.
 """
 
 import os
 import geopandas as gpd
+from file_utils import is_up_to_date
 
 def main():
 
     
     # Define input and output paths
-    cs_features_path = 'working/02/CS-Features-patched.shp'
-    ts_gbr_features_path = 'working/02/TS-GBR-Features-patched.shp'
-    nw_aus_features_path = 'working/02/NW-Aus-Features-patched.shp'
+    cs_features_path = 'working/02/CS-Features-patched.parquet'
+    ts_gbr_features_path = 'working/02/TS-GBR-Features-patched.parquet'
+    nw_aus_features_path = 'working/02/NW-Aus-Features-patched.parquet'
     
     # Create output directory if it doesn't exist
     output_dir = 'working/03'
     os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, 'TS-GBR-CS-NW-Features.shp')
+    output_path = os.path.join(output_dir, 'TS-GBR-CS-NW-Features.gpkg')
+    
+    if is_up_to_date(output_path, [cs_features_path, ts_gbr_features_path, nw_aus_features_path],
+                     __file__):
+        print(f"{output_path} is newer than its inputs, skipping. Delete it to force a rerun.")
+        return
     
-    print("Reading input shapefiles...")
-    # Read input shapefiles
-    cs_gdf = gpd.read_file(cs_features_path)
-    ts_gbr_gdf = gpd.read_file(ts_gbr_features_path)
-    nw_aus_gdf = gpd.read_file(nw_aus_features_path)
+    print("Reading input datasets...")
+    # Read input datasets
+    cs_gdf = gpd.read_parquet(cs_features_path)
+    ts_gbr_gdf = gpd.read_parquet(ts_gbr_features_path)
+    nw_aus_gdf = gpd.read_parquet(nw_aus_features_path)
     
     # Print information about input datasets
     print(f"CS-Features: {len(cs_gdf)} features")
@@ -37,27 +47,29 @@ def main():
     print(f"TS-GBR-Features CRS: {ts_gbr_gdf.crs}")
     print(f"NW-Aus-Features CRS: {nw_aus_gdf.crs}")
     
-    # Get the superset of all columns
-    all_columns = set()
-    for gdf in [cs_gdf, ts_gbr_gdf, nw_aus_gdf]:
-        all_columns.update(gdf.columns)
-    
-    # Ensure geometry column is handled properly
-    all_columns.discard('geometry')
-    all_columns = list(all_columns)
+    datasets = [("CS-Features", cs_gdf),
+                ("TS-GBR-Features", ts_gbr_gdf),
+                ("NW-Aus-Features", nw_aus_gdf)]
+
+    # Get the superset of all columns, in the order they are first seen
+    all_columns = list(dict.fromkeys(
+        col for _, gdf in datasets for col in gdf.columns if col != 'geometry'
+    ))
     
-    # Make sure all GeoDataFrames have the same columns
-    for name, gdf in [("CS-Features", cs_gdf), 
-                     ("TS-GBR-Features", ts_gbr_gdf), 
-                     ("NW-Aus-Features", nw_aus_gdf)]:
-        for col in all_columns:
-            if col not in gdf.columns:
-                print(f"Adding missing column '{col}' to {name}")
-                gdf[col] = None
+    # Make sure all GeoDataFrames have the same columns. All the missing columns of a
+    # dataset are added in one step, rather than inserted one at a time. They are filled
+    # with None (object columns), not NaN, so that an integer column missing from one
+    # dataset isn't turned into a float column by the concat.
+    aligned = []
+    for name, gdf in datasets:
+        missing_columns = [col for col in all_columns if col not in gdf.columns]
+        for col in missing_columns:
+            print(f"Adding missing column '{col}' to {name}")
+        aligned.append(gdf.assign(**dict.fromkeys(missing_columns))[all_columns + ['geometry']])
     
     # Concatenate the GeoDataFrames
-    print("Merging shapefiles...")
-    merged_gdf = gpd.pd.concat([cs_gdf, ts_gbr_gdf, nw_aus_gdf], ignore_index=True)
+    print("Merging datasets...")
+    merged_gdf = gpd.pd.concat(aligned, ignore_index=True)
 
     # Debug: Print CRS of merged_gdf before setting CRS
     print(f"Merged GeoDataFrame CRS before set_crs: {merged_gdf.crs}")
@@ -68,9 +80,9 @@ def main():
     # Print information about the merged dataset
     print(f"Merged dataset: {len(merged_gdf)} features")
     
-    # Save the merged shapefile
-    print(f"Saving merged shapefile to: {output_path}")
-    merged_gdf.to_file(output_path)
+    # Save the merged GeoPackage
+    print(f"Saving merged GeoPackage to: {output_path}")
+    merged_gdf.to_file(output_path, driver="GPKG")
     print("Merge completed successfully.")
 
 if __name__ == "__main__":
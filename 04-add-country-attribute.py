@@ -10,8 +10,8 @@ Purpose:
 Key Algorithms:
     1. Spatial Overlay Analysis: Intersects reef boundary polygons with country EEZ polygons
     2. Area-Based Attribution: For each reef feature, calculates the area of intersection
-       with each country's EEZ and determines primary/secondary countries based on the
-       proportion of area that falls within each EEZ
+       with each country's EEZ (in the EPSG:3577 equal-area projection) and determines
+       primary/secondary countries based on the proportion of area that falls within each EEZ
     3. Cross-Boundary Handling: Where reefs cross multiple EEZs, the script:
        - Assigns the country with the greatest overlap area as Sovereign1
        - Assigns the country with the second greatest overlap as SOVEREIGN2
@@ -34,23 +34,25 @@ Output Attributes:
 import geopandas as gpd
 import os
 import sys
-import configparser
+import config_loader
 from pathlib import Path
 from shapely.ops import unary_union
 from shapely.geometry import box  # Import box from shapely.geometry
 import numpy as np
-from tqdm import tqdm
+import pandas as pd
+import shapely
 import time
 
+# Equal-area CRS (GDA94 / Australian Albers) used to calculate the reef areas
+AREA_EPSG = 3577
+
 print("Starting script to add country attributes to reef features...")
 
 # Load configuration
-config = configparser.ConfigParser()
-config.read('config.ini')
-in_3p_path = config['general']['in_3p_path']
+in_3p_path = config_loader.in_3p_path()
 
 # Define paths
-reef_features_path = "working/03/TS-GBR-CS-NW-Features.shp"
+reef_features_path = "working/03/TS-GBR-CS-NW-Features.gpkg"
 country_eez_dir = os.path.join(in_3p_path, "EEZ-land-union_2024")
 country_eez_path = os.path.join(country_eez_dir, "EEZ_land_union_v4_202410.shp")
 
@@ -63,37 +65,44 @@ if not os.path.exists(country_eez_path):
 
 print("Loading datasets...")
 
-# Load reef features shapefile
+# Load reef features
 try:
-    reef_features = gpd.read_file(reef_features_path)
+    reef_features = gpd.read_file(reef_features_path, use_arrow=True)
     print(f"Loaded {len(reef_features)} reef features.")
 except Exception as e:
-    print(f"Error loading reef features shapefile: {e}")
-    sys.exit(1)
-
-# Load CountryEEZ shapefile
-try:
-    country_eez = gpd.read_file(country_eez_path)
-    print(f"Loaded {len(country_eez)} EEZ features.")
-except Exception as e:
-    print(f"Error loading CountryEEZ shapefile: {e}")
+    print(f"Error loading reef features: {e}")
     sys.exit(1)
 
 # Ensure both datasets are in EPSG:4326
 if reef_features.crs != "EPSG:4326":
     reef_features = reef_features.to_crs("EPSG:4326")
     print("Reprojected reef features to EPSG:4326")
+
+# Load CountryEEZ shapefile. The global EEZ dataset is filtered to the bounding box of
+# the reef features as it is read, so GDAL skips the EEZ features far from any reef.
+# The bbox is passed as a GeoSeries so that it is reprojected to the CRS of the shapefile.
+reef_bbox = reef_features.total_bounds
+try:
+    country_eez = gpd.read_file(
+        country_eez_path, bbox=gpd.GeoSeries([box(*reef_bbox)], crs=reef_features.crs),
+        use_arrow=True
+    )
+    print(f"Loaded {len(country_eez)} EEZ features within the reef features extent.")
+except Exception as e:
+    print(f"Error loading CountryEEZ shapefile: {e}")
+    sys.exit(1)
     
 if country_eez.crs != "EPSG:4326":
     country_eez = country_eez.to_crs("EPSG:4326")
     print("Reprojected CountryEEZ to EPSG:4326")
 
-# Clip the CountryEEZ to the reef boundaries extent for performance
+# Clip the CountryEEZ to the reef boundaries extent for performance. The bbox read only
+# compares bounding boxes, so this removes the EEZ features that don't actually touch it.
 print("Clipping CountryEEZ to reef boundaries extent...")
-reef_bbox = reef_features.total_bounds
-country_eez_clipped = country_eez[country_eez.geometry.intersects(
-    gpd.GeoSeries([box(*reef_bbox)], crs=reef_features.crs).geometry[0]
-)]
+# The spatial index query only runs the exact intersects test on the EEZ features whose
+# bounding boxes overlap the extent. The matches are sorted to keep the original order.
+eez_matches = country_eez.sindex.query(box(*reef_bbox), predicate='intersects')
+country_eez_clipped = country_eez.iloc[np.sort(eez_matches)]
 print(f"Clipped CountryEEZ from {len(country_eez)} to {len(country_eez_clipped)} features.")
 
 # Add new columns to reef features
@@ -105,14 +114,16 @@ reef_features['Union'] = None
 
 # Add a check for invalid geometries before processing
 print("Checking for invalid or null geometries...")
-null_geom_count = reef_features[reef_features.geometry.isna()].shape[0]
+# Build the null geometry mask once and reuse it for the count, report and filter
+null_geom_mask = reef_features.geometry.isna().to_numpy()
+null_geom_count = int(null_geom_mask.sum())
 if null_geom_count > 0:
     print(f"WARNING: Found {null_geom_count} features with null geometries.")
-    null_geom_indices = reef_features[reef_features.geometry.isna()].index.tolist()
+    null_geom_indices = reef_features.index[null_geom_mask].tolist()
     print(f"Indices with null geometries: {null_geom_indices}")
     
     # Optional: Remove features with null geometries
-    reef_features = reef_features[~reef_features.geometry.isna()].copy()
+    reef_features = reef_features[~null_geom_mask].copy()
     print(f"Removed {null_geom_count} features. Continuing with {len(reef_features)} valid features.")
 
 # Debug: Print the attribute names of the country_eez_clipped
@@ -122,107 +133,123 @@ print(f"CountryEEZ attributes: {list(country_eez_clipped.columns)}")
 print(f"Processing {len(reef_features)} reef features...")
 start_time = time.time()
 
-for i, reef in tqdm(reef_features.iterrows(), total=len(reef_features)):
-    # Add safety check for None geometry
-    if reef.geometry is None:
-        print(f"WARNING: Feature at index {i} has None geometry. Skipping...")
-        reef_features.at[i, 'Sovereign1'] = 'Unknown (Invalid Geometry)'
-        reef_features.at[i, 'Sov1_Perc'] = 0
-        reef_features.at[i, 'Union'] = 'Unknown (Invalid Geometry)'
-        continue
-    
-    # Find intersections with CountryEEZ
-    intersections = []
-    total_area = reef.geometry.area
+# Find all the intersecting reef/EEZ pairs with a single bulk query of the EEZ spatial
+# index, so each reef is only tested against the EEZ polygons around it, rather than
+# against every clipped EEZ feature. The query returns the positions of the pairs.
+reef_geometries = reef_features.geometry.to_numpy()
+eez_geometries = country_eez_clipped.geometry.to_numpy()
+reef_positions, eez_positions = country_eez_clipped.sindex.query(reef_geometries)
+# Refine the bounding box candidates with an exact intersects test. The EEZ polygons are
+# large and each is tested against many reefs, so they are prepared once (indexing their
+# edges) and passed as the first argument so that the prepared geometry is used. A
+# predicate in the query would prepare each reef instead.
+shapely.prepare(eez_geometries)
+intersects = shapely.intersects(eez_geometries[eez_positions], reef_geometries[reef_positions])
+reef_positions, eez_positions = reef_positions[intersects], eez_positions[intersects]
+# Order the pairs by reef, then by EEZ feature, so the intersections of each reef are
+# listed in the same order as the CountryEEZ features
+order = np.lexsort((eez_positions, reef_positions))
+reef_positions, eez_positions = reef_positions[order], eez_positions[order]
 
-    
-    
-    for j, eez in country_eez_clipped.iterrows():
-        if reef.geometry.intersects(eez.geometry):
-            intersection = reef.geometry.intersection(eez.geometry)
-            if not intersection.is_empty:
-                area = intersection.area
-                percentage = round((area / total_area) * 100)  # Round to integer
-                intersections.append({
-                    'Union': eez['UNION'],
-                    'Sovereign1': eez['SOVEREIGN1'],
-                    'area': area,
-                    'percentage': percentage
-                })
-
-    # Sort by area descending
-    intersections = sorted(intersections, key=lambda x: x['area'], reverse=True)
-    
-    if len(intersections) == 0:
-        # No intersections found (reef might be outside of all EEZs)
-        reef_features.at[i, 'Sovereign1'] = 'International Waters'
-        reef_features.at[i, 'Sov1_Perc'] = 100
-        reef_features.at[i, 'Union'] = 'International Waters'
-
-    elif len(intersections) == 1:
-        # Single country
-        reef_features.at[i, 'Sovereign1'] = intersections[0]['Sovereign1']
-        reef_features.at[i, 'Sov1_Perc'] = 100
-        reef_features.at[i, 'Union'] = intersections[0]['Union']
-
-    elif len(intersections) == 2:
-        # Two countries
-        reef_features.at[i, 'Sovereign1'] = intersections[0]['Sovereign1']
-        reef_features.at[i, 'Sovereign2'] = intersections[1]['Sovereign1']
-        reef_features.at[i, 'Sov1_Perc'] = intersections[0]['percentage'] 
-        reef_features.at[i, 'Sov2_Perc'] = intersections[1]['percentage']
-        reef_features.at[i, 'Union'] = f"{intersections[0]['Union']};{intersections[1]['Union']}"
+# Intersect all the pairs with shapely's vectorised functions, which work directly on
+# the arrays of geometries
+intersection_geometries = shapely.intersection(reef_geometries[reef_positions],
+                                               eez_geometries[eez_positions])
+non_empty = ~shapely.is_empty(intersection_geometries)
+
+# Calculate the areas in the Australian Albers equal-area projection, rather than in
+# square degrees, which shrink away from the equator. Only the reefs and their (small)
+# intersections are projected, once each, rather than the large EEZ polygons.
+reef_areas = reef_features.geometry.to_crs(epsg=AREA_EPSG).area.to_numpy()
+intersection_areas = gpd.GeoSeries(intersection_geometries, crs=reef_features.crs).to_crs(
+    epsg=AREA_EPSG).area.to_numpy()
+
+# Table of the non-empty intersections, ordered by reef and then by area (largest first).
+# The sort is stable, so intersections with equal areas stay in CountryEEZ order.
+reef_positions, eez_positions = reef_positions[non_empty], eez_positions[non_empty]
+# Integer codes for the UNION values, so the Union of each reef can be worked out on the
+# codes and each distinct combination only joined into a string once
+eez_union_codes, union_categories = pd.factorize(country_eez_clipped['UNION'].to_numpy(),
+                                                 use_na_sentinel=False)
+intersections = pd.DataFrame({
+    'reef': reef_positions,
+    'eez': eez_positions,
+    'Union': union_categories[eez_union_codes[eez_positions]],
+    'union_code': eez_union_codes[eez_positions],
+    'Sovereign1': country_eez_clipped['SOVEREIGN1'].to_numpy()[eez_positions],
+    'area': intersection_areas[non_empty],
+})
+# Percentage of the reef in each intersection, rounded to an integer
+intersections['percentage'] = np.round(
+    (intersections['area'] / reef_areas[reef_positions]) * 100
+).astype(int)
+intersections = intersections.sort_values(['reef', 'area'], ascending=[True, False], kind='stable')
+intersections['rank'] = intersections.groupby('reef').cumcount()
+region_counts = intersections.groupby('reef').size()
+intersections['regions'] = region_counts.reindex(intersections['reef']).to_numpy()
 
+# Reefs intersecting one or two country regions use their intersections directly. For
+# more than two regions, the intersections with the same sovereign country are
+# consolidated so the data fits the two-country model. The consolidated countries are
+# ordered by their total area, with ties kept in order of their largest intersection.
+multi = intersections[intersections['regions'] > 2]
+consolidated = (multi.groupby(['reef', 'Sovereign1'], sort=False)
+                .agg(area=('area', 'sum'), percentage=('percentage', 'sum'), first=('rank', 'min'))
+                .reset_index()
+                .sort_values(['reef', 'area', 'first'], ascending=[True, False, True], kind='stable'))
+consolidated['rank'] = consolidated.groupby('reef').cumcount()
+country_counts = consolidated.groupby('reef').size()
+
+for reef_position, items in multi.groupby('reef', sort=True):
+    i = reef_features.index[reef_position]
+    print(f"Feature {i} intersects with {len(items)} country regions:")
+    for idx, item in enumerate(items.itertuples()):
+        print(f"  {idx+1}. {item.Sovereign1} ({item.percentage}%) - {item.Union}")
+    if country_counts[reef_position] <= 2:
+        print(f"  After consolidating duplicate sovereigns: {country_counts[reef_position]} unique countries")
     else:
-        # More than two countries - check for duplicate sovereigns to consolidate
-        print(f"Feature {i} intersects with {len(intersections)} country regions:")
-        for idx, item in enumerate(intersections):
-            print(f"  {idx+1}. {item['Sovereign1']} ({item['percentage']}%) - {item['Union']}")
-        
-        # Consolidate intersections with the same sovereign country
-        sovereign_dict = {}
-        union_values = set()
-        
-        for item in intersections:
-            sovereign = item['Sovereign1']
-            union_values.add(item['Union'])
-            
-            if sovereign in sovereign_dict:
-                # Add to existing sovereign entry
-                sovereign_dict[sovereign]['area'] += item['area']
-                sovereign_dict[sovereign]['percentage'] += item['percentage']
-            else:
-                # Create new sovereign entry
-                sovereign_dict[sovereign] = {
-                    'Sovereign1': sovereign,
-                    'area': item['area'],
-                    'percentage': item['percentage']
-                }
-        
-        # Convert back to a list and sort by area
-        consolidated = list(sovereign_dict.values())
-        consolidated = sorted(consolidated, key=lambda x: x['area'], reverse=True)
-        
-        if len(consolidated) <= 2:
-            print(f"  After consolidating duplicate sovereigns: {len(consolidated)} unique countries")
-            # We can use our standard two-country approach with the consolidated data
-            reef_features.at[i, 'Sovereign1'] = consolidated[0]['Sovereign1']
-            reef_features.at[i, 'Sov1_Perc'] = round(consolidated[0]['percentage'])
-            
-            if len(consolidated) == 2:
-                reef_features.at[i, 'Sovereign2'] = consolidated[1]['Sovereign1']
-                reef_features.at[i, 'Sov2_Perc'] = round(consolidated[1]['percentage'])
-            
-            # Still preserve all UNION values
-            reef_features.at[i, 'Union'] = ";".join(union_values)
-        else:
-            print(f"  Warning: Feature {i} still has {len(consolidated)} unique countries after consolidation")
-            # Take the top two countries by area
-            reef_features.at[i, 'Sovereign1'] = consolidated[0]['Sovereign1']
-            reef_features.at[i, 'Sovereign2'] = consolidated[1]['Sovereign1']
-            reef_features.at[i, 'Sov1_Perc'] = round(consolidated[0]['percentage'])
-            reef_features.at[i, 'Sov2_Perc'] = round(consolidated[1]['percentage'])
-            reef_features.at[i, 'Union'] = ";".join(union_values)
+        print(f"  Warning: Feature {i} still has {country_counts[reef_position]} unique countries after consolidation")
+
+# The first and second countries of each reef
+ranked = pd.concat([intersections[intersections['regions'] <= 2], consolidated])
+first = ranked[ranked['rank'] == 0].set_index('reef')
+second = ranked[ranked['rank'] == 1].set_index('reef')
+
+# Union of each reef. For two regions the two UNION values are joined in order of area.
+# For more than two, each distinct UNION value is kept once. Many reefs share the same
+# combination of UNION values, so the combinations of codes are found first and each
+# distinct combination is joined into a string once.
+simple = intersections[intersections['regions'] <= 2]
+union_keys = pd.concat([
+    simple.groupby('reef')['union_code'].agg(tuple),
+    multi.groupby('reef')['union_code'].agg(lambda codes: tuple(dict.fromkeys(codes))),
+])
+union_key_codes, unique_union_keys = pd.factorize(union_keys.to_numpy())
+unique_union_values = np.array([';'.join(union_categories[list(key)]) for key in unique_union_keys],
+                               dtype=object)
+
+# Build the result columns as arrays and assign them once. Reefs with no intersections
+# (outside of all EEZs) are in international waters.
+n_reefs = len(reef_features)
+sovereign1 = np.full(n_reefs, 'International Waters', dtype=object)
+sovereign2 = np.full(n_reefs, None, dtype=object)
+sov1_perc = np.full(n_reefs, 100)
+sov2_perc = np.zeros(n_reefs, dtype=int)
+union = np.full(n_reefs, 'International Waters', dtype=object)
+
+sovereign1[first.index] = first['Sovereign1'].to_numpy()
+# A single region has all of the reef, otherwise use the (consolidated) percentages
+sov1_perc[first.index] = np.where(region_counts.reindex(first.index).to_numpy() == 1,
+                                  100, first['percentage'].to_numpy())
+sovereign2[second.index] = second['Sovereign1'].to_numpy()
+sov2_perc[second.index] = second['percentage'].to_numpy()
+union[union_keys.index] = unique_union_values[union_key_codes]
+
+reef_features['Sovereign1'] = sovereign1
+reef_features['Sovereign2'] = sovereign2
+reef_features['Sov1_Perc'] = sov1_perc
+reef_features['Sov2_Perc'] = sov2_perc
+reef_features['Union'] = union
 
 # Save the updated shapefile
 output_path = "working/04/TS-GBR-CS-NW-Features-Country.shp"
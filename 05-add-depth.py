@@ -47,25 +47,27 @@ NOTES:
     - The 90th percentile value represents the highest/shallowest point within each reef
     - The 10th percentile represents the deepest point within each reef
     - Rule-based overrides are used to improve classification for certain reef types/attachments
+    - The percentiles are calculated in parallel, with the reefs split into one chunk per CPU
 """
 
 import os
 import geopandas as gpd
 import rasterio
 import numpy as np
-from rasterio.mask import mask
+from rasterio.features import geometry_mask, geometry_window
+from rasterio.errors import WindowError
+import shapely
 from shapely.geometry import mapping, box
-from rasterio.sample import sample_gen
-import configparser
+import config_loader
 import pandas as pd
 import math
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
 import subprocess
 from osgeo import gdal
 
 # Read configuration for DEM dataset paths
-config = configparser.ConfigParser()
-config.read('config.ini')
-download_path = config.get('general', 'in_3p_path')
+download_path = config_loader.in_3p_path()
 
 # Define input and output paths
 INPUT_SHAPE = "working/04/TS-GBR-CS-NW-Features-Country.shp"
@@ -78,6 +80,27 @@ AUSBATHYTOPO_TIF = os.path.join(download_path, "AusBathyTopo-250m_2024", "AusBat
 OUTPUT_DIR = "working/05"
 OUTPUT_SHAPE = os.path.join(OUTPUT_DIR, "TS-GBR-CS-NW-Features-depth.shp")
 
+# GDAL settings for reading the bathymetry. Each reef polygon reads a small window
+# of the rasters and neighbouring reefs often share raster blocks, so a larger
+# block cache and VSI read cache avoid repeatedly decompressing the same blocks.
+# GDAL_NUM_THREADS allows multi-threaded decompression of the COG blocks.
+GDAL_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+GDAL_ENV_OPTIONS = {
+    'GDAL_CACHEMAX': GDAL_CACHE_MAX_BYTES,
+    'GDAL_NUM_THREADS': 'ALL_CPUS',
+    'VSI_CACHE': 'TRUE',
+    'VSI_CACHE_SIZE': 512 * 1024 * 1024,
+}
+gdal.SetCacheMax(GDAL_CACHE_MAX_BYTES)
+for key, value in GDAL_ENV_OPTIONS.items():
+    if key != 'GDAL_CACHEMAX':
+        gdal.SetConfigOption(key, str(value))
+
+# Number of worker processes used to calculate the depth percentiles. Each reef is
+# independent, so the reefs are split into one chunk per worker and each worker opens
+# its own handles on the rasters. The count is set by num_workers in config.ini.
+NUM_WORKERS = config_loader.num_workers()
+
 # Create output directory if it doesn't exist
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -95,145 +118,191 @@ def create_multires_vrt():
     else:
         print("MultiResBathyEEZ VRT already exists.")
 
-def get_statistics(geometry, raster_src):
-    """Calculate percentile statistics (10th, 50th, 90th) of the raster within the polygon geometry"""
-    try:
-        # Get raster data within the geometry
-        geom = [mapping(geometry)]
-        out_image, out_transform = mask(raster_src, geom, crop=True, all_touched=False, nodata=None)
-        
-        # Get valid data (exclude nodata values)
-        out_image_masked = out_image[0]
-        
-        # Check if we have any valid data within the polygon
-        if np.all(np.isnan(out_image_masked)) or out_image_masked.size == 0:
-            # No valid pixels found, use centroid sampling instead
-            centroid = geometry.centroid
-            # Sample the raster at the centroid point
-            sample_gen_result = list(sample_gen(raster_src, [(centroid.x, centroid.y)]))
-            if sample_gen_result and sample_gen_result[0] is not None and not np.isnan(sample_gen_result[0][0]):
-                value = float(sample_gen_result[0][0])
-                # Return the same value for all percentiles since we only have one point
-                return value, value, value
-            else:
-                # Still no valid data, return None
-                return None, None, None
-        
-        # IMPORTANT: Explicitly mask the -32767 value which appears to be a NoData value
-        # Create a masked array excluding both NaN and -32767 values
-        valid_data = out_image_masked[out_image_masked != -32767]
-        
-        # Only calculate statistics if we have valid data left
-        if valid_data.size == 0:
-            # Try centroid method instead
-            centroid = geometry.centroid
-            sample_gen_result = list(sample_gen(raster_src, [(centroid.x, centroid.y)]))
-            if sample_gen_result and sample_gen_result[0] is not None and not np.isnan(sample_gen_result[0][0]) and sample_gen_result[0][0] != -32767:
-                value = float(sample_gen_result[0][0])
-                return value, value, value
-            else:
-                return None, None, None
-        
-        # Calculate percentiles with the properly masked data
-        p10 = np.nanpercentile(valid_data, 10)
-        p50 = np.nanpercentile(valid_data, 50)
-        p90 = np.nanpercentile(valid_data, 90)
-        
-        return p10, p50, p90
-    except Exception as e:
-        print(f"Error processing geometry: {e}")
-        return None, None, None
-
-def get_percentiles_from_raster(geometry, raster_src, nodata_val, feature_idx=None, raster_path=None, target_crs=None):
-    """Calculate percentiles (10, 50, 90) for a polygon from a raster, with centroid fallback. Adds debug info."""
+def get_valid_pixels(geometry, raster_src, nodata_val, feature_idx=None):
+    """Return the valid raster values within a polygon, or None if they couldn't be read. Adds debug info."""
     try:
-        # Reproject geometry if needed
-        if target_crs is not None and hasattr(geometry, 'crs') and geometry.crs != target_crs:
-            # geometry is a GeoSeries or GeoDataFrame row
-            geom_proj = geometry.to_crs(target_crs)
-            geom = [mapping(geom_proj)]
-        elif target_crs is not None:
-            # geometry is a shapely geometry, reproject manually
-            import pyproj
-            from shapely.ops import transform
-            project = pyproj.Transformer.from_crs("EPSG:{}".format(geometry.crs.to_epsg()) if hasattr(geometry, 'crs') and geometry.crs else "EPSG:4326", target_crs, always_xy=True).transform
-            geom_proj = transform(project, geometry)
-            geom = [mapping(geom_proj)]
-        else:
-            geom = [mapping(geometry)]
-        out_image, _ = mask(raster_src, geom, crop=True, all_touched=False, nodata=nodata_val)
-        arr = out_image[0]
-        # Mask nodata
-        valid = arr[(arr != nodata_val) & (~np.isnan(arr))]
-        if valid.size == 0:
-            # Fallback: centroid
-            centroid = geometry.centroid
-            if target_crs is not None:
-                import pyproj
-                from shapely.ops import transform
-                project = pyproj.Transformer.from_crs("EPSG:{}".format(geometry.crs.to_epsg()) if hasattr(geometry, 'crs') and geometry.crs else "EPSG:4326", target_crs, always_xy=True).transform
-                centroid_proj = transform(project, centroid)
-                sample_pt = (centroid_proj.x, centroid_proj.y)
-            else:
-                sample_pt = (centroid.x, centroid.y)
-            val = list(raster_src.sample([sample_pt]))[0][0]
-            if val != nodata_val and not np.isnan(val):
-                return val, val, val
-            else:
-                return None, None, None
-        p10 = np.nanpercentile(valid, 10)
-        p50 = np.nanpercentile(valid, 50)
-        p90 = np.nanpercentile(valid, 90)
-        return p10, p50, p90
+        # Read the first band in the window covering the polygon directly, and rasterise the
+        # polygon over just that window, rather than going through rasterio.mask.mask which
+        # reads every band and builds an intermediate masked copy of the crop.
+        shapes = [mapping(geometry)]
+        try:
+            window = geometry_window(raster_src, shapes)
+        except WindowError:
+            raise ValueError('Input shapes do not overlap raster.')
+        arr = raster_src.read(1, window=window, masked=True)
+        inside = geometry_mask(shapes, out_shape=arr.shape, transform=raster_src.window_transform(window),
+                               invert=True, all_touched=False)
+        # Keep the pixels inside the polygon that aren't the dataset's own nodata
+        arr = arr.data[inside & ~np.ma.getmaskarray(arr)]
+        # Drop any NaN holes, and the nodata value in case the raster doesn't declare it
+        return arr[(arr != nodata_val) & (~np.isnan(arr))]
     except Exception as e:
         print(f"Error extracting percentiles: {e}")
         if feature_idx is not None:
             print(f"  Feature index: {feature_idx}")
             print(f"  Feature geometry bounds: {geometry.bounds}")
         if raster_src is not None:
-            print(f"  Raster path: {raster_path}")
+            print(f"  Raster path: {raster_src.name}")
             print(f"  Raster bounds: {raster_src.bounds}")
-        return None, None, None
+        return None
+
+def sample_centroids(geometries, raster_src, nodata_val):
+    """Sample the raster at the centroids of the geometries, with a single sample call for
+    all of them. Used for polygons smaller than a pixel or without valid pixels.
+    Returns the value for each geometry, or None where the value is nodata."""
+    if not geometries:
+        return []
+    centroids = shapely.centroid(np.asarray(geometries, dtype=object))
+    coords = list(zip(shapely.get_x(centroids), shapely.get_y(centroids)))
+    try:
+        values = [sample[0] for sample in raster_src.sample(coords)]
+    except Exception as e:
+        print(f"Error sampling {len(coords)} centroids from {raster_src.name}: {e}")
+        return [None] * len(coords)
+    return [val if val != nodata_val and not np.isnan(val) else None for val in values]
 
-def assign_depth_percentiles(geometry, rasters, feature_idx=None, geometry_crs=None):
-    """Try each raster in order, reprojecting geometry as needed, return percentiles and source name."""
-    import pyproj
-    from shapely.ops import transform 
+def open_rasters(rasters, stack):
+    """Open each raster that exists once, registering it with the ExitStack so they are
+    closed together. Opening the VRT parses its XML and opens each source, so this is
+    done once for the whole run rather than for every feature.
+    Returns a list of (open dataset, nodata value, source name)."""
+    open_srcs = []
     for raster_path, nodata_val, src_name in rasters:
         if not os.path.exists(raster_path):
+            print(f"WARNING: Raster {raster_path} not found, skipping it.")
             continue
-        with rasterio.open(raster_path) as src:
-            raster_crs = src.crs
-            # Reproject geometry if needed
-            if geometry_crs is not None and raster_crs is not None and geometry_crs != raster_crs:
-                # geometry is a shapely geometry, reproject manually
-                project = pyproj.Transformer.from_crs(geometry_crs, raster_crs, always_xy=True).transform
-                geom_proj = transform(project, geometry)
+        open_srcs.append((stack.enter_context(rasterio.open(raster_path)), nodata_val, src_name))
+    return open_srcs
+
+def get_worker_gdal_options(num_workers):
+    """GDAL settings for one of num_workers processes reading the rasters at the same time.
+    The block and VSI cache budgets are shared between the workers, rather than each
+    worker getting the full amount, and each worker decompresses with a single thread
+    as the workers already use all the CPUs."""
+    if num_workers <= 1:
+        return GDAL_ENV_OPTIONS
+    return {
+        **GDAL_ENV_OPTIONS,
+        'GDAL_CACHEMAX': GDAL_CACHE_MAX_BYTES // num_workers,
+        'GDAL_NUM_THREADS': '1',
+        'VSI_CACHE_SIZE': GDAL_ENV_OPTIONS['VSI_CACHE_SIZE'] // num_workers,
+    }
+
+def process_feature_chunk(rasters, geometries, feature_indices, geometry_crs, num_workers=1):
+    """Open the rasters and calculate the depth percentiles for a chunk of reef geometries.
+    This runs in a worker process, so the rasters are opened here rather than being
+    shared with the main process. feature_indices are the indices of the geometries in
+    the whole dataset, used when reporting warnings. num_workers is the number of
+    worker processes running at the same time, used to share out the GDAL caches.
+    Returns a list of (p10, p50, p90, source name) for each geometry."""
+    gdal_options = get_worker_gdal_options(num_workers)
+    # Apply the settings through both GDAL bindings, as for the module level settings
+    gdal.SetCacheMax(gdal_options['GDAL_CACHEMAX'])
+    for key, value in gdal_options.items():
+        if key != 'GDAL_CACHEMAX':
+            gdal.SetConfigOption(key, str(value))
+    with rasterio.Env(**gdal_options), ExitStack() as stack:
+        open_srcs = open_rasters(rasters, stack)
+        covered = get_raster_coverage(geometries, open_srcs, geometry_crs)
+        return assign_depth_percentiles(geometries, open_srcs, covered,
+                                        feature_indices=feature_indices, geometry_crs=geometry_crs)
+
+def get_raster_coverage(geometries, open_srcs, geometry_crs):
+    """Work out which rasters each geometry intersects the extent of, with one vectorised
+    intersects test per raster, so that rasters that can't contain any values for a reef
+    are skipped rather than tried and failing for every reef. Rasters in a different CRS
+    to the geometries are always tried.
+    Returns a boolean array with a row per geometry and a column per raster."""
+    geometry_array = np.asarray(geometries, dtype=object)
+    covered = np.ones((len(geometry_array), len(open_srcs)), dtype=bool)
+    for j, (src, _, _) in enumerate(open_srcs):
+        if geometry_crs is None or src.crs is None or geometry_crs == src.crs:
+            covered[:, j] = shapely.intersects(geometry_array, box(*src.bounds))
+    return covered
+
+def get_hilbert_order(geometries):
+    """Return the order that visits the geometries along a Hilbert curve. Reefs that are
+    next to each other in this order are close together, so their raster windows tend to
+    fall in the same raster blocks, which are then still in the GDAL block cache.
+    Empty or missing geometries are placed at the start."""
+    distances = np.zeros(len(geometries), dtype=np.int64)
+    has_geometry = ~(geometries.isna() | geometries.is_empty).to_numpy()
+    if has_geometry.any():
+        distances[has_geometry] = geometries[has_geometry].hilbert_distance().to_numpy()
+    return np.argsort(distances, kind='stable')
+
+def assign_depth_percentiles(geometries, rasters, covered, feature_indices=None, geometry_crs=None):
+    """Try each open raster in order, reprojecting geometries as needed, return percentiles and
+    source name for each geometry. covered flags the rasters whose extent each geometry
+    intersects. Geometries with no valid pixels fall back to the value at their centroid,
+    which is sampled for all of those geometries together, once per raster."""
+    if feature_indices is None:
+        feature_indices = list(range(len(geometries)))
+    results = [(None, None, None, None)] * len(geometries)
+    remaining = list(range(len(geometries)))
+    for j, (src, nodata_val, src_name) in enumerate(rasters):
+        raster_crs = src.crs
+        # Reproject the remaining geometries if needed, all together in one vectorised
+        # transform rather than one geometry at a time
+        if geometry_crs is not None and raster_crs is not None and geometry_crs != raster_crs:
+            projected = gpd.GeoSeries([geometries[k] for k in remaining], crs=geometry_crs).to_crs(raster_crs)
+            geometries_proj = dict(zip(remaining, projected))
+        else:
+            geometries_proj = geometries
+        unresolved = []
+        no_pixels = []
+        for k in remaining:
+            if not covered[k, j]:
+                unresolved.append(k)
+                continue
+            geom_proj = geometries_proj[k]
+            valid = get_valid_pixels(geom_proj, src, nodata_val, feature_idx=feature_indices[k])
+            if valid is None:
+                unresolved.append(k)
+            elif valid.size == 0:
+                no_pixels.append((k, geom_proj))
             else:
-                geom_proj = geometry
-            p10, p50, p90 = get_percentiles_from_raster(
-                geom_proj, src, nodata_val, feature_idx=feature_idx, raster_path=raster_path, target_crs=None
-            )
-            if all(v is not None for v in (p10, p50, p90)):
-                return p10, p50, p90, src_name
-    print(f"WARNING: No valid raster found for feature {feature_idx}. Geometry bounds: {geometry.bounds}")
-    return None, None, None, None
-
-def determine_depth_category(p90_elevation):
-    """Determine depth category based on 90th percentile elevation value"""
-    if p90_elevation is None:
-        return None
-    
-    if p90_elevation >= -2.5:
-        return "Very Shallow"
-    elif p90_elevation >= -30:
-        return "Shallow"
-    else:
-        return "Deep"
+                # NaNs have already been removed, so use the plain percentile and compute
+                # all three from a single sort of the data.
+                p10, p50, p90 = np.percentile(valid, [10, 50, 90])
+                results[k] = (p10, p50, p90, src_name)
+        # Fallback: centroid
+        values = sample_centroids([geom_proj for _, geom_proj in no_pixels], src, nodata_val)
+        for (k, _), val in zip(no_pixels, values):
+            if val is None:
+                unresolved.append(k)
+            else:
+                results[k] = (val, val, val, src_name)
+        remaining = sorted(unresolved)
+    for k in remaining:
+        print(f"WARNING: No valid raster found for feature {feature_indices[k]}. Geometry bounds: {geometries[k].bounds}")
+    return results
+
+def determine_depth_categories(p90_elevations):
+    """Determine depth categories based on a column of 90th percentile elevation values.
+    Only None gives no category. NaN values (from a mix of missing and found values)
+    compare as below -30 and so are categorised as 'Deep'.
+    Returns an object array of the categories."""
+    values = p90_elevations.to_numpy(dtype=object)
+    numeric = pd.to_numeric(p90_elevations).to_numpy(dtype=float)
+    categories = np.select(
+        [numeric >= -2.5, numeric >= -30],
+        ["Very Shallow", "Shallow"],
+        default="Deep"
+    ).astype(object)
+    categories[np.equal(values, None)] = None
+    return categories
+
+def get_text_column(gdf, column):
+    """Return the column as an array of stripped strings, or empty strings if the column
+    doesn't exist."""
+    if column not in gdf.columns:
+        return np.full(len(gdf), '', dtype=object)
+    return gdf[column].astype(str).str.strip().to_numpy(dtype=object)
 
 def main():
     print(f"Reading shapefile from {INPUT_SHAPE}")
-    reefs = gpd.read_file(INPUT_SHAPE)
+    reefs = gpd.read_file(INPUT_SHAPE, use_arrow=True)
 
     # Debug: Check bounds of all features before any reprojection
     all_bounds = np.array([geom.bounds for geom in reefs.geometry])
@@ -260,7 +329,11 @@ def main():
     ]
 
     print(f"Reading raster from {MULTIRES_VRT}")
-    with rasterio.open(MULTIRES_VRT) as src:
+    # The GDAL settings are also applied through rasterio.Env as rasterio may be
+    # linked against its own copy of GDAL.
+    with rasterio.Env(**GDAL_ENV_OPTIONS), ExitStack() as stack:
+        open_srcs = open_rasters(rasters, stack)
+        src = open_srcs[0][0]
         # Check raster properties
         print(f"Raster CRS: {src.crs}")
         print(f"Shapefile CRS: {reefs.crs}")
@@ -271,19 +344,36 @@ def main():
             reefs = reefs.to_crs(src.crs)
         # Set current_crs after possible reprojection
         current_crs = reefs.crs
-        
-        # Calculate statistics for each polygon
-        print("Calculating depth percentiles within each reef polygon...")
-        p10_values, p50_values, p90_values, src_values = [], [], [], []
-        total = len(reefs)
-        for i, geom in enumerate(reefs.geometry):
-            if i % 100 == 0:
-                print(f"Processing feature {i+1}/{total}...")
-            p10, p50, p90, src_name = assign_depth_percentiles(geom, rasters, feature_idx=i, geometry_crs=current_crs)
-            p10_values.append(p10)
-            p50_values.append(p50)
-            p90_values.append(p90)
-            src_values.append(src_name)
+        # Only pass the rasters that were found on to the workers
+        rasters = [raster for raster in rasters if os.path.exists(raster[0])]
+
+    # Calculate statistics for each polygon
+    print("Calculating depth percentiles within each reef polygon...")
+    # Process the reefs in Hilbert curve order rather than input order, which can jump
+    # between distant parts of the rasters
+    order = get_hilbert_order(reefs.geometry)
+    geometries = list(reefs.geometry.iloc[order])
+    feature_indices = order.tolist()
+    total = len(geometries)
+    num_workers = min(NUM_WORKERS, total)
+    if num_workers <= 1:
+        sorted_results = process_feature_chunk(rasters, geometries, feature_indices, current_crs)
+    else:
+        # Contiguous chunks, so that each worker reads reefs that are near each other
+        chunk_size = math.ceil(total / num_workers)
+        sorted_results = []
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(process_feature_chunk, rasters, geometries[start:start + chunk_size],
+                                       feature_indices[start:start + chunk_size], current_crs, num_workers)
+                       for start in range(0, total, chunk_size)]
+            for future in futures:
+                sorted_results.extend(future.result())
+                print(f"Processed features {len(sorted_results)}/{total}...")
+    # Put the results back in the original feature order
+    results = [None] * total
+    for feature_idx, result in zip(feature_indices, sorted_results):
+        results[feature_idx] = result
+    p10_values, p50_values, p90_values, src_values = (list(values) for values in zip(*results))
 
     # Add values to the GeoDataFrame
     print("Adding depth percentile statistics to the shapefile...")
@@ -302,52 +392,45 @@ def main():
 
     # Calculate depth categories and sources where needed
     print("Calculating depth categories and sources...")
-    for i, row in reefs.iterrows():
-        # Only update depth category if it's not already set
-        if pd.isna(row['DepthCat']) or row['DepthCat'] is None or row['DepthCat'] == '':
-            rb_type = str(row.get('RB_Type_L3', '')).strip()
-            attachment = str(row.get('Attachment', '')).strip()
-            orig_type = str(row.get('OrigType', '')).strip()
-            est_depth_cat = determine_depth_category(row['DEM90p'])
-
-            # Apply rules. These are to compensate for imperfect estimates from the DEM.
-            rule_applied = False
-            # Coral Reef, Fringing: If estimated is 'Deep', set to 'Shallow'
-            if rb_type == 'Coral Reef' and attachment == 'Fringing':
-                if est_depth_cat == 'Deep':
-                    reefs.at[i, 'DepthCat'] = 'Shallow'
-                    rule_applied = True
-            # Rocky Reef, Fringing: If estimated is 'Deep', set to 'Shallow'
-            elif rb_type == 'Rocky Reef' and attachment == 'Fringing':
-                if est_depth_cat == 'Deep':
-                    reefs.at[i, 'DepthCat'] = 'Shallow'
-                    rule_applied = True
-            # Intertidal Sediment, Fringing or Isolated: Set to 'Intertidal'
-            elif rb_type == 'Intertidal Sediment' and attachment in ['Fringing', 'Isolated']:
-                reefs.at[i, 'DepthCat'] = 'Intertidal'
-                rule_applied = True
-            # Island, Fringing or Isolated: Set to 'Land'
-            elif rb_type == 'Island' and attachment in ['Fringing', 'Isolated']:
-                reefs.at[i, 'DepthCat'] = 'Land'
-                rule_applied = True
-            # Unvegetated Cay, Fringing or Isolated: Set to 'Land'
-            elif rb_type == 'Unvegetated Cay' and attachment in ['Fringing', 'Isolated', 'Land']:
-                reefs.at[i, 'DepthCat'] = 'Land'
-                rule_applied = True
-            elif orig_type in ['Pearl Pontoon', 'Channel Marker']:
-                reefs.at[i, 'DepthCat'] = 'Surface'
-                rule_applied = True
-
-            if rule_applied:
-                # If a rule was applied, set the DepthCatSr to the rule source
-                reefs.at[i, 'DepthCatSr'] = 'RB_Type_L3 rule'
-            # If no rule applied, use estimated depth category as before
-            if not rule_applied and est_depth_cat:
-                reefs.at[i, 'DepthCat'] = est_depth_cat
-                reefs.at[i, 'DepthCatSr'] = src_values[i]
-        # Set DEM source
-        if pd.isna(row['DEMSr']) or row['DEMSr'] is None or row['DEMSr'] == '':
-            reefs.at[i, 'DEMSr'] = src_values[i]
+    src_values = np.array(src_values, dtype=object)
+    # Only update depth category if it's not already set
+    needs_depth_cat = (reefs['DepthCat'].isna() | (reefs['DepthCat'] == '')).to_numpy()
+    rb_type = get_text_column(reefs, 'RB_Type_L3')
+    attachment = get_text_column(reefs, 'Attachment')
+    orig_type = get_text_column(reefs, 'OrigType')
+    est_depth_cat = determine_depth_categories(reefs['DEM90p'])
+
+    # Apply rules. These are to compensate for imperfect estimates from the DEM.
+    # The rule groups are exclusive, checked in this order, and the first group that
+    # matches a feature decides whether a rule is applied to it.
+    # Coral Reef or Rocky Reef, Fringing: If estimated is 'Deep', set to 'Shallow'
+    fringing_reef = np.isin(rb_type, ['Coral Reef', 'Rocky Reef']) & (attachment == 'Fringing')
+    # Intertidal Sediment, Fringing or Isolated: Set to 'Intertidal'
+    intertidal = (rb_type == 'Intertidal Sediment') & np.isin(attachment, ['Fringing', 'Isolated'])
+    # Island, Fringing or Isolated: Set to 'Land'
+    island = (rb_type == 'Island') & np.isin(attachment, ['Fringing', 'Isolated'])
+    # Unvegetated Cay, Fringing, Isolated or Land: Set to 'Land'
+    cay = (rb_type == 'Unvegetated Cay') & np.isin(attachment, ['Fringing', 'Isolated', 'Land'])
+    # Pearl Pontoon or Channel Marker: Set to 'Surface'
+    surface = (~(fringing_reef | intertidal | island | cay)
+               & np.isin(orig_type, ['Pearl Pontoon', 'Channel Marker']))
+    rule_depth_cat = np.select(
+        [fringing_reef & (est_depth_cat == 'Deep'), intertidal, island | cay, surface],
+        ['Shallow', 'Intertidal', 'Land', 'Surface'],
+        default=''
+    )
+    rule_applied = needs_depth_cat & (rule_depth_cat != '')
+    # If a rule was applied, set the DepthCatSr to the rule source
+    reefs.loc[rule_applied, 'DepthCat'] = rule_depth_cat[rule_applied]
+    reefs.loc[rule_applied, 'DepthCatSr'] = 'RB_Type_L3 rule'
+    # If no rule applied, use estimated depth category as before
+    use_estimate = (needs_depth_cat & ~rule_applied
+                    & np.not_equal(est_depth_cat, None) & (est_depth_cat != ''))
+    reefs.loc[use_estimate, 'DepthCat'] = est_depth_cat[use_estimate]
+    reefs.loc[use_estimate, 'DepthCatSr'] = src_values[use_estimate]
+    # Set DEM source
+    needs_dem_source = (reefs['DEMSr'].isna() | (reefs['DEMSr'] == '')).to_numpy()
+    reefs.loc[needs_dem_source, 'DEMSr'] = src_values[needs_dem_source]
 
     # Save the result
     print(f"Saving output shapefile to {OUTPUT_SHAPE}")
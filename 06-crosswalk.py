@@ -48,17 +48,15 @@ import os
 import pandas as pd
 import geopandas as gpd
 import numpy as np
-import configparser
+import config_loader
 
 # Input/output paths
 INPUT_SHP = "working/05/TS-GBR-CS-NW-Features-depth.shp"
 MISMATCHED_SHP = "working/06/Feature-mismatched.shp"
 
 
-config = configparser.ConfigParser()
-config.read('config.ini')
-in_3p_path = config.get('general', 'in_3p_path')
-version = config.get('general', 'version')
+in_3p_path = config_loader.in_3p_path()
+version = config_loader.version()
 
 output_shp = f"working/06/TS-GBR-CS-NW-Features_{version}.shp"
 
@@ -114,36 +112,32 @@ def main():
 
     # Prepare for matching
     print("Matching features to crosswalk...")
-    match_indices = []
-    crosswalk_indices = []
-    mismatched_indices = []
-
-    # Build a lookup for fast matching (by RB_Type_L3_v0-4)
-    crosswalk_lookup = {}
-    for idx, row in crosswalk.iterrows():
-        key = row['RB_Type_L3_v0-4']
-        crosswalk_lookup.setdefault(key, []).append((idx, row['Attachment_v0-4_list'], row['DepthCat_v0-4_list']))
-
-    for i, feat in gdf.iterrows():
-        key = feat['RB_Type_L3']
-        attachment = feat['Attachment']
-        depthcat = feat['DepthCat']
-        candidates = crosswalk_lookup.get(key, [])
-        found = False
-        for idx, attachment_list, depthcat_list in candidates:
-            if attachment in attachment_list and depthcat in depthcat_list:
-                match_indices.append(i)
-                crosswalk_indices.append(idx)
-                found = True
-                break
-        if not found:
-            mismatched_indices.append(i)
+    # Expand the crosswalk to one row per (RB_Type_L3, Attachment, DepthCat) combination
+    # that it accepts, keeping the first crosswalk row for each combination, so that all
+    # the features can be matched with a single merge. Crosswalk rows with no Attachment
+    # or DepthCat values can't match any feature and are dropped.
+    crosswalk_combinations = (
+        crosswalk[['RB_Type_L3_v0-4', 'Attachment_v0-4_list', 'DepthCat_v0-4_list']]
+        .rename(columns={'RB_Type_L3_v0-4': 'RB_Type_L3', 'Attachment_v0-4_list': 'Attachment',
+                         'DepthCat_v0-4_list': 'DepthCat'})
+        .explode('Attachment')
+        .explode('DepthCat')
+        .dropna(subset=['Attachment', 'DepthCat'])
+        .reset_index(names='crosswalk_index')
+        .drop_duplicates(subset=['RB_Type_L3', 'Attachment', 'DepthCat'], keep='first')
+    )
+    matches = gdf[['RB_Type_L3', 'Attachment', 'DepthCat']].merge(
+        crosswalk_combinations, how='left', on=['RB_Type_L3', 'Attachment', 'DepthCat'])
+    matched = matches['crosswalk_index'].notna().to_numpy()
+    match_indices = np.flatnonzero(matched)
+    crosswalk_indices = matches['crosswalk_index'].to_numpy()[matched].astype(int)
+    mismatched_indices = np.flatnonzero(~matched)
 
     print(f"  Matched {len(match_indices)} features.")
     print(f"  {len(mismatched_indices)} features could not be matched.")
 
     # If mismatches, save and abort
-    if mismatched_indices:
+    if len(mismatched_indices) > 0:
         print("Saving mismatched features for review...")
         mismatched_gdf = gdf.iloc[mismatched_indices]
         os.makedirs(os.path.dirname(MISMATCHED_SHP), exist_ok=True)
@@ -156,13 +150,10 @@ def main():
 
     # Prepare output dataframe
     print("Preparing output dataframe...")
-    matched_gdf = gdf.iloc[match_indices].copy()
-    crosswalk_matched = crosswalk.iloc[crosswalk_indices].reset_index(drop=True)
-    matched_gdf = matched_gdf.reset_index(drop=True)
+    matched_gdf = gdf.iloc[match_indices].reset_index(drop=True)
 
-    # Add crosswalk fields
-    for field in CROSSWALK_FIELDS:
-        matched_gdf[field] = crosswalk_matched[field].values
+    # Add crosswalk fields, looking up all the fields of the matched crosswalk rows at once
+    matched_gdf[CROSSWALK_FIELDS] = crosswalk[CROSSWALK_FIELDS].to_numpy()[crosswalk_indices]
 
     # Recalculate Area_km2
     print("Reprojecting to EPSG:3112 for area calculation...")
@@ -0,0 +1,54 @@
+"""
+Shared access to the settings in config.ini.
+
+The processing scripts each need the data paths and version from config.ini. This module
+parses the file once when it is first imported and provides getters for the settings,
+so that scripts run in the same process (or that import each other) don't repeatedly
+re-read and re-parse the file.
+"""
+import configparser
+import functools
+import os
+
+CONFIG_PATH = 'config.ini'
+
+# ProcessPoolExecutor raises a ValueError on Windows for more than 61 workers
+MAX_WORKERS = 61
+
+CONFIG = configparser.ConfigParser()
+CONFIG.read(CONFIG_PATH)
+
+
+@functools.cache
+def in_3p_path() -> str:
+    """
+    :return: Path to where the downloaded third party data is saved.
+    """
+    return CONFIG.get('general', 'in_3p_path')
+
+
+@functools.cache
+def in_path() -> str:
+    """
+    :return: Path to the input data created for this dataset, such as the GBR corrections.
+    """
+    return CONFIG.get('general', 'in_path')
+
+
+@functools.cache
+def version() -> str:
+    """
+    :return: Version of the dataset being worked on.
+    """
+    return CONFIG.get('general', 'version')
+
+
+@functools.cache
+def num_workers() -> int:
+    """
+    :return: Number of worker processes to use for the slow processing steps. This is
+        the optional num_workers setting, defaulting to the number of CPUs up to 8, and
+        is capped at MAX_WORKERS.
+    """
+    default = min(os.cpu_count() or 1, 8)
+    return max(1, min(CONFIG.getint('general', 'num_workers', fallback=default), MAX_WORKERS))
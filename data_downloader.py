@@ -1,4 +1,3 @@
-import urllib.request
 import os
 import sys
 import time
@@ -6,8 +5,29 @@ import zipfile
 import tempfile
 import shutil
 import glob
-from typing import List
-
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from typing import List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Size of the chunks read from the network and of the file write buffer. Large chunks
+# keep the number of read/write calls (and progress hook calls) low for the multi GB
+# bathymetry downloads.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MB
+WRITE_BUFFER_SIZE = 4 * 1024 * 1024  # 4 MB
+# Size of the buffer used to copy each decompressed ZIP entry to disk.
+UNZIP_BUFFER_SIZE = 1024 * 1024  # 1 MB
+# Maximum number of threads used to decompress the entries of a ZIP file.
+MAX_UNZIP_WORKERS = 4
+# Maximum number of HTTP range requests in flight across all ranged downloads. Files
+# downloaded at the same time share this budget rather than each opening their own set
+# of connections to the server.
+MAX_RANGE_WORKERS = 8
 
 class DataDownloader:
     """
@@ -37,9 +57,13 @@ class DataDownloader:
     download_unzip_keep_subset(url: str, zip_file_patterns: List[str], dataset_name: str) -> None
     - Downloads a ZIP from `url`, unzips to a temp location, then moves only matching files to `download_path/dataset_name`.
 
+    The download methods are safe to call from multiple threads at once, allowing independent
+    datasets to be downloaded in parallel. Progress timing is tracked per thread. All downloads
+    share a single pooled HTTP session so that repeated downloads from the same host reuse
+    keep-alive connections rather than paying for a new TCP and TLS handshake each time.
+    Call close() (or use the downloader as a context manager) to release the connections.
+
     Class Attributes:
-        start_time (float): Tracks the start time of the most recent download.
-        last_report_time (float): Tracks the time of the last status update during a download.
         download_path (str): Local base directory for downloaded content.
         tmp_path (tempfile.TemporaryDirectory): Temporary directory object for intermediate operations.
     """
@@ -50,41 +74,81 @@ class DataDownloader:
 
         :param download_path: Base directory where downloaded files are stored.
         """
-        self.start_time = 0.0
-        self.last_report_time = 0.0
         self.download_path = download_path
+        # Per-thread download progress (start_time, last_report_time, name) so that
+        # parallel downloads don't overwrite each other's timing.
+        self._progress = threading.local()
         self.tmp_path = tempfile.TemporaryDirectory()  # Holds temporary files during processing
 
+        # Shared HTTP session. The pool is sized to allow for parallel downloads from the
+        # same host, and transient server errors are retried with a backoff.
+        self._session = requests.Session()
+        retries = Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16, max_retries=retries)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+
+        # Worker pool shared by all ranged downloads, so concurrent large downloads from
+        # the same host share one concurrency budget and the session's connection pool.
+        self._range_executor = ThreadPoolExecutor(max_workers=MAX_RANGE_WORKERS,
+                                                  thread_name_prefix='range-download')
+
+        # Define a set of headers to mimic a common browser request. This allows us
+        # to download files from websites that may perform user agent checks or reject
+        self._session.headers.update({
+            "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                        "AppleWebKit/537.36 (KHTML, like Gecko) "
+                        "Chrome/58.0.3029.110 Safari/537.36"),
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.5"
+        })
+
+    def close(self) -> None:
+        """
+        Closes the shared HTTP session and range download workers, releasing any
+        pooled connections.
+        """
+        self._range_executor.shutdown()
+        self._session.close()
+
+    def __enter__(self) -> 'DataDownloader':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
     def _reporthook(self, count: int, block_size: int, total_size: int) -> None:
         """
-        A hook function used by urllib.request.urlretrieve to display download progress.
+        A hook function called as each block is downloaded to display download progress.
 
         :param count: The current block count.
         :param block_size: The size of each block in bytes.
         :param total_size: The total size of the file in bytes (or -1 if unknown).
         """
+        progress = self._progress
         current_time = time.time()
         if count == 0:
-            self.start_time = current_time
-            self.last_report_time = current_time
+            progress.start_time = current_time
+            progress.last_report_time = current_time
             return
-        time_since_last_report = current_time - self.last_report_time
+        time_since_last_report = current_time - progress.last_report_time
         if time_since_last_report > 1:  # Update progress every 1 second
-            self.last_report_time = current_time
-            duration = current_time - self.start_time
+            progress.last_report_time = current_time
+            duration = current_time - progress.start_time
             progress_size = int(count * block_size)
             speed = int(progress_size / (1024 * duration))
+            name = getattr(progress, 'name', '')
 
             if total_size != -1:
                 percent = int(count * block_size * 100 / total_size)
-                sys.stdout.write("%d%%, %d MB, %d KB/s, %d secs    \r" %
-                                 (percent, progress_size / (1024 * 1024), speed, duration))
+                sys.stdout.write("%s: %d%%, %d MB, %d KB/s, %d secs    \r" %
+                                 (name, percent, progress_size / (1024 * 1024), speed, duration))
             else:
-                sys.stdout.write("%d MB, %d KB/s, %d secs    \r" %
-                                 (progress_size / (1024 * 1024), speed, duration))
+                sys.stdout.write("%s: %d MB, %d KB/s, %d secs    \r" %
+                                 (name, progress_size / (1024 * 1024), speed, duration))
             sys.stdout.flush()
 
-    def _download(self, url: str, path: str) -> None:
+    def _download(self, url: str, path: str, num_parts: int = 1) -> Optional[str]:
         """
         Downloads a file from the given URL to the specified local path.
 
@@ -92,46 +156,320 @@ class DataDownloader:
         Otherwise, it downloads the file to a temporary location and then moves it to the desired path.
         During the download, a progress indicator is displayed via the `_reporthook` method.
 
+        Interrupted downloads are resumed from the partial temporary file using HTTP range
+        requests, provided the server supports them and the remote file has not changed
+        (checked using its ETag or Last-Modified header).
+
         :param url: The URL of the file to be downloaded.
         :param path: The local path (including filename) where the file should be saved.
+        :param num_parts: Number of HTTP range requests to split the download into. Values
+                          greater than 1 download the parts concurrently (up to
+                          MAX_RANGE_WORKERS at once, shared with any other ranged downloads),
+                          provided the server supports range requests; otherwise a single
+                          stream is used.
+        :return: SHA-256 hex digest of the downloaded file, calculated as it was downloaded,
+                 or None if the download was skipped.
         """
         if os.path.exists(path):
             print(f"Skipping download of {path}; it already exists")
+            return None
         else:
             print(f"Downloading from {url}")
             dest_dir = os.path.dirname(path)
-            if not os.path.exists(dest_dir):
-                os.makedirs(dest_dir)
+            # exist_ok as another download thread may create the same folder
+            os.makedirs(dest_dir, exist_ok=True)
             tmp_path = path + '.tmp'
+            self._progress.name = os.path.basename(path)
 
-            # Define a set of headers to mimic a common browser request. This allows us
-            # to download files from websites that may perform user agent checks or reject
-            headers = {
-                "User-Agent": ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                            "AppleWebKit/537.36 (KHTML, like Gecko) "
-                            "Chrome/58.0.3029.110 Safari/537.36"),
-                "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                "Accept-Language": "en-US,en;q=0.5"
-            }
-            req = urllib.request.Request(url, headers=headers)
-
-            with urllib.request.urlopen(req) as response, open(tmp_path, 'wb') as out_file:
-                total_size = response.getheader('Content-Length')
-                total_size = int(total_size) if total_size is not None else -1
-                block_size = 8192  # 8 KB block size
-                count = 0
-                self.start_time = time.time()
-                self.last_report_time = time.time()
-                while True:
-                    chunk = response.read(block_size)
-                    if not chunk:
-                        break
-                    out_file.write(chunk)
-                    count += 1
-                    self._reporthook(count, block_size, total_size)
+            range_info = self._get_range_info(url) if num_parts > 1 else None
+            if range_info is not None:
+                total_size, validator = range_info
+                sha256 = self._download_ranged(url, tmp_path, total_size, num_parts, validator)
+            else:
+                if num_parts > 1:
+                    print(f"Server does not support range requests, downloading {url} as a single stream")
+                sha256 = self._download_stream(url, tmp_path)
             os.rename(tmp_path, path)
             print("\nDownload complete")
+            return sha256
+
+    @staticmethod
+    def _remove_if_exists(path: str) -> None:
+        """
+        Deletes a file, ignoring it if it doesn't exist.
+
+        :param path: Path of the file to delete.
+        """
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def _hash_file_range(hasher, path: str, start: int, length: int) -> None:
+        """
+        Adds a byte range of a file to a running hash.
+
+        :param hasher: hashlib object to update.
+        :param path: File to read.
+        :param start: Offset of the first byte.
+        :param length: Number of bytes to add.
+        """
+        buffer = memoryview(bytearray(DOWNLOAD_CHUNK_SIZE))
+        with open(path, 'rb', buffering=0) as f:
+            f.seek(start)
+            while length > 0:
+                num_bytes = f.readinto(buffer[:min(length, DOWNLOAD_CHUNK_SIZE)])
+                if not num_bytes:
+                    break
+                hasher.update(buffer[:num_bytes])
+                length -= num_bytes
+
+    @staticmethod
+    def _get_validator(headers) -> Optional[str]:
+        """
+        Returns the value that identifies the version of a remote file, used to check that a
+        partial download can be safely resumed.
+
+        :param headers: HTTP response headers.
+        :return: The ETag, falling back to the Last-Modified date, or None if neither is provided.
+        """
+        return headers.get('ETag') or headers.get('Last-Modified')
+
+    def _download_stream(self, url: str, tmp_path: str) -> str:
+        """
+        Downloads a URL as a single stream into tmp_path, resuming from any partial file
+        left by a previous interrupted download.
+
+        The remote file's validator is saved to a '.etag' sidecar file alongside the partial
+        download. On a rerun the download continues from the end of the partial file using
+        a range request with If-Range, so the server sends the whole file again if it has
+        changed since.
+
+        The SHA-256 of the file is calculated from the chunks as they are written, so no
+        second pass over the file is needed to checksum it.
+
+        :param url: The URL of the file to be downloaded.
+        :param tmp_path: The local path to write the file to.
+        :return: SHA-256 hex digest of the downloaded file.
+        """
+        etag_path = tmp_path + '.etag'
+        headers = {}
+        resume_from = 0
+        try:
+            resume_from = os.stat(tmp_path).st_size
+            with open(etag_path, 'r') as f:
+                validator = f.read().strip()
+            if validator and resume_from > 0:
+                headers = {'Range': f'bytes={resume_from}-', 'If-Range': validator}
+        except FileNotFoundError:
+            # No partial download to resume
+            resume_from = 0
+
+        with self._session.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 416:
+                # The partial file doesn't match the remote file, so start again.
+                response.close()
+                self._remove_if_exists(etag_path)
+                return self._download_stream(url, tmp_path)
+            response.raise_for_status()
+            if response.status_code == 206:
+                print(f"Resuming download from {resume_from / (1024 * 1024):.0f} MB")
+                mode = 'ab'
+            else:
+                resume_from = 0
+                mode = 'wb'
+                validator = self._get_validator(response.headers)
+                if validator:
+                    with open(etag_path, 'w') as f:
+                        f.write(validator)
+                else:
+                    self._remove_if_exists(etag_path)
+
+            total_size = response.headers.get('Content-Length')
+            total_size = int(total_size) + resume_from if total_size is not None else -1
+            downloaded = resume_from
+            sha256 = hashlib.sha256()
+            if resume_from:
+                # Include the part downloaded by the previous run in the checksum.
+                self._hash_file_range(sha256, tmp_path, 0, resume_from)
+            with open(tmp_path, mode, buffering=WRITE_BUFFER_SIZE) as out_file:
+                self._reporthook(0, 1, total_size)
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    out_file.write(chunk)
+                    sha256.update(chunk)
+                    downloaded += len(chunk)
+                    self._reporthook(downloaded, 1, total_size)
+        self._remove_if_exists(etag_path)
+        return sha256.hexdigest()
+
+    def _get_range_info(self, url: str) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Checks whether the server supports HTTP range requests for the URL.
+
+        :param url: The URL of the file to be downloaded.
+        :return: Tuple of the size of the file in bytes and its validator (ETag or
+                 Last-Modified, may be None), or None if range requests are not supported
+                 or the size is unknown.
+        """
+        response = self._session.head(url, allow_redirects=True)
+        if not response.ok:
+            return None
+        content_length = response.headers.get('Content-Length')
+        if response.headers.get('Accept-Ranges', '').lower() != 'bytes' or content_length is None:
+            return None
+        return int(content_length), self._get_validator(response.headers)
+
+    def _download_part(self, url: str, tmp_path: str, start: int, end: int,
+                       validator: Optional[str], progress: List[int], lock: threading.Lock) -> None:
+        """
+        Downloads the byte range [start, end] of the URL into the same offset of tmp_path.
+
+        :param url: The URL of the file to be downloaded.
+        :param tmp_path: The pre-sized file to write the range into.
+        :param start: First byte of the range.
+        :param end: Last byte of the range (inclusive).
+        :param validator: ETag or Last-Modified of the file, used to detect it changing mid-download.
+        :param progress: Single element list holding the total bytes downloaded across all parts.
+        :param lock: Lock protecting the progress counter.
+        """
+        headers = {'Range': f'bytes={start}-{end}'}
+        if validator:
+            headers['If-Range'] = validator
+        with self._session.get(url, headers=headers, stream=True) as response, \
+                open(tmp_path, 'r+b', buffering=WRITE_BUFFER_SIZE) as out_file:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IOError(f"Server ignored the range request for {url} (status {response.status_code}). "
+                              f"The remote file may have changed during the download.")
+            out_file.seek(start)
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                out_file.write(chunk)
+                with lock:
+                    progress[0] += len(chunk)
+
+    @staticmethod
+    def _preallocate(path: str, size: int) -> None:
+        """
+        Creates (or truncates) a file and sizes it to the given number of bytes.
+
+        Where supported, the space is reserved with posix_fallocate so the filesystem can
+        allocate the large bathymetry files as a few contiguous extents, rather than
+        growing the file piece by piece as the parts are written. Elsewhere (Windows,
+        macOS) the file is extended with truncate, giving a sparse file.
+
+        :param path: Path of the file to create.
+        :param size: Size of the file in bytes.
+        """
+        with open(path, 'wb') as out_file:
+            if size > 0 and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(out_file.fileno(), 0, size)
+                    return
+                except OSError:
+                    # Not supported by this filesystem, fall back to a sparse file.
+                    pass
+            out_file.truncate(size)
+
+    def _download_ranged(self, url: str, tmp_path: str, total_size: int, num_parts: int,
+                         validator: Optional[str] = None) -> str:
+        """
+        Downloads a file as several concurrent HTTP range requests. Each part is written
+        directly to its offset in the output file. A single TCP stream is often limited
+        well below the link bandwidth on long distance connections, so multiple streams
+        help with the very large bathymetry files.
+
+        As the parts arrive out of order, the SHA-256 is calculated by this thread while the
+        download continues, hashing each part once it and all the parts before it are
+        complete. The part is normally still in the OS page cache at that point.
 
+        Completed parts are recorded in a '.parts' sidecar file so that an interrupted
+        download only needs to fetch the unfinished parts when rerun, provided the remote
+        file's validator is unchanged.
+
+        :param url: The URL of the file to be downloaded.
+        :param tmp_path: The local path to write the file to.
+        :param total_size: The size of the file in bytes.
+        :param num_parts: Number of ranges to split the download into.
+        :param validator: ETag or Last-Modified of the remote file. Without it a partial
+                          download can't be safely resumed.
+        :return: SHA-256 hex digest of the downloaded file.
+        """
+        parts_path = tmp_path + '.parts'
+        part_size = -(-total_size // num_parts)  # Ceiling division
+        part_starts = list(range(0, total_size, part_size))
+
+        # Work out which parts were completed by a previous run, if any.
+        state = {'validator': validator, 'total_size': total_size, 'part_size': part_size, 'done': []}
+        previous = None
+        if validator:
+            try:
+                if os.stat(tmp_path).st_size == total_size:
+                    with open(parts_path, 'r') as f:
+                        previous = json.load(f)
+            except FileNotFoundError:
+                pass
+        if previous is not None:
+            if all(previous.get(k) == state[k] for k in ('validator', 'total_size', 'part_size')):
+                state['done'] = previous.get('done', [])
+        if not state['done']:
+            # Size the file up front so each part can write at its own offset.
+            self._preallocate(tmp_path, total_size)
+        remaining = [start for start in part_starts if start not in state['done']]
+        if len(remaining) < len(part_starts):
+            print(f"Resuming download, {len(part_starts) - len(remaining)} of {len(part_starts)} parts already complete")
+        print(f"Downloading {total_size / (1024 * 1024):.0f} MB in {num_parts} parts")
+
+        progress = [sum(min(part_size, total_size - start) for start in state['done'])]
+        lock = threading.Lock()
+
+        completed = set(state['done'])
+        sha256 = hashlib.sha256()
+        hashed_parts = 0
+
+        def download_part(start):
+            self._download_part(url, tmp_path, start, min(start + part_size, total_size) - 1,
+                                validator, progress, lock)
+            with lock:
+                completed.add(start)
+                if validator:
+                    state['done'].append(start)
+                    with open(parts_path, 'w') as f:
+                        json.dump(state, f)
+
+        def hash_completed_parts():
+            # Hash the parts, in order, up to the first one that is not yet complete.
+            nonlocal hashed_parts
+            while hashed_parts < len(part_starts):
+                start = part_starts[hashed_parts]
+                with lock:
+                    if start not in completed:
+                        return
+                self._hash_file_range(sha256, tmp_path, start, min(part_size, total_size - start))
+                hashed_parts += 1
+
+        # The parts are queued on the shared range pool. Parts of other files being
+        # downloaded at the same time are interleaved on the same workers.
+        pending = [self._range_executor.submit(download_part, start) for start in remaining]
+        # Report progress from this thread while the parts download.
+        self._reporthook(0, 1, total_size)
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_EXCEPTION)
+            for future in done:
+                if future.exception() is not None:
+                    for other in pending:
+                        other.cancel()
+                    # Let any parts already in progress finish writing before giving up.
+                    wait(pending)
+                    raise future.exception()
+            hash_completed_parts()
+            with lock:
+                downloaded = progress[0]
+            if downloaded:
+                self._reporthook(downloaded, 1, total_size)
+        hash_completed_parts()
+        self._remove_if_exists(parts_path)
+        return sha256.hexdigest()
 
     def unzip(self, zip_file_path: str, unzip_path: str, path_test: str) -> None:
         """
@@ -166,25 +504,108 @@ class DataDownloader:
                         msg = (f"Extraction path too long for Windows (Max: 260 chars). "
                                f"It is {len(full_path)} characters. {full_path}")
                         raise ValueError(msg)
-                zip_ref.extractall(tmp_unzip_path)
+                self._extract_all(zip_ref, absolute_unzip_path)
 
             # Rename the tmp_unzip_path to the final name
             os.rename(tmp_unzip_path, unzip_path)
 
+    def _extract_all(self, zip_ref: zipfile.ZipFile, extract_path: str) -> None:
+        """
+        Extracts all members of an open ZIP file into extract_path.
+
+        This is equivalent to ZipFile.extractall, but only creates each output directory
+        once and then decompresses the files on several threads. zlib releases the GIL
+        while inflating, so entries are decompressed in parallel, each thread reading the
+        archive through its own file handle. This matters for the larger multi-file
+        archives such as the TS-GBR features and AusBathyTopo.
+
+        :param zip_ref: The open ZIP file to extract.
+        :param extract_path: Absolute path of the directory to extract into.
+        """
+        created_dirs = set()
+        invalid_parts = ('', os.path.curdir, os.path.pardir)
+        # Target path -> entry. If the archive has duplicate names, the last one wins
+        # as with extractall.
+        files = {}
+        for info in zip_ref.infolist():
+            # Strip drive letters, absolute paths and '..' components in the same way
+            # as ZipFile.extractall so entries can't be written outside extract_path.
+            arcname = info.filename.replace('/', os.path.sep)
+            if os.path.altsep:
+                arcname = arcname.replace(os.path.altsep, os.path.sep)
+            arcname = os.path.splitdrive(arcname)[1]
+            arcname = os.path.sep.join(
+                part for part in arcname.split(os.path.sep) if part not in invalid_parts)
+            target_path = os.path.join(extract_path, arcname)
+
+            target_dir = target_path if info.is_dir() else os.path.dirname(target_path)
+            if target_dir not in created_dirs:
+                os.makedirs(target_dir, exist_ok=True)
+                created_dirs.add(target_dir)
+            if not info.is_dir():
+                files[target_path] = info
+
+        # Largest entries first, dealt round robin, to balance the work across threads.
+        entries = sorted(files.items(), key=lambda item: item[1].file_size, reverse=True)
+        num_workers = min(MAX_UNZIP_WORKERS, os.cpu_count() or 1, len(entries))
+        if num_workers <= 1:
+            self._extract_entries(zip_ref, entries)
+        else:
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(self._extract_zip_entries, zip_ref.filename, entries[i::num_workers])
+                           for i in range(num_workers)]
+                for future in futures:
+                    future.result()
+
+    def _extract_zip_entries(self, zip_file_path: str, entries: List[Tuple[str, zipfile.ZipInfo]]) -> None:
+        """
+        Opens a separate handle on the ZIP file and extracts the given entries. Used so
+        that each extraction thread reads the archive independently.
+
+        :param zip_file_path: Path to the ZIP file.
+        :param entries: List of (target path, ZipInfo) to extract.
+        """
+        with zipfile.ZipFile(zip_file_path, 'r') as zip_ref:
+            self._extract_entries(zip_ref, entries)
+
+    @staticmethod
+    def _extract_entries(zip_ref: zipfile.ZipFile, entries: List[Tuple[str, zipfile.ZipInfo]]) -> None:
+        """
+        Copies each entry to its target path through a single reused 1 MB buffer, rather
+        than allocating a small copy buffer per entry.
+
+        :param zip_ref: The open ZIP file.
+        :param entries: List of (target path, ZipInfo) to extract.
+        """
+        buffer = memoryview(bytearray(UNZIP_BUFFER_SIZE))
+        for target_path, info in entries:
+            with zip_ref.open(info) as source, open(target_path, 'wb', buffering=0) as target:
+                while True:
+                    num_bytes = source.readinto(buffer)
+                    if not num_bytes:
+                        break
+                    target.write(buffer[:num_bytes])
+
     def download_only(self, 
                       url: str, 
                       dataset_name: str,
                       filename: str = None,
-                      subfolder_name: str = None) -> None:
+                      subfolder_name: str = None,
+                      num_parts: int = 1) -> None:
         """
         Downloads a file from the given URL and saves it into a folder based on 
         the dataset_name, and optionally a subfolder_name, using the download_path as the base path.
+        The SHA-256 checksum of the file, calculated during the download, is saved alongside
+        it as '<filename>.sha256'.
 
         :param url: URL to download the file from.
         :param dataset_name: The name of the dataset (used for directory naming).
         :param filename: Optional name to save the file as. If None, will extract from the URL.
         :param subfolder_name: Optional subfolder to differentiate between multiple downloads 
                                for the same dataset.
+        :param num_parts: Number of concurrent HTTP range requests to use. Useful for very
+                          large files. Falls back to a single stream if the server doesn't
+                          support range requests.
         """
         base_path = os.path.join(self.download_path, dataset_name)
         download_path = os.path.join(base_path, subfolder_name if subfolder_name else "")
@@ -200,7 +621,12 @@ class DataDownloader:
         print(f"Download path: {file_path}")
         
         # Download the file directly to the final location
-        self._download(url, file_path)
+        sha256 = self._download(url, file_path, num_parts=num_parts)
+        if sha256 is not None:
+            # Record the checksum (in sha256sum format) so the download can be verified
+            # later without the cost of re-reading the whole file to calculate it.
+            with open(file_path + '.sha256', 'w') as f:
+                f.write(f"{sha256}  {filename}\n")
 
     def download_and_unzip(self, 
                            url: str, 
@@ -264,7 +690,7 @@ class DataDownloader:
         
         print(f"Unzip folder: {unzip_path}")
 
-        if os.path.exists(unzip_path) and os.listdir(unzip_path):  # Check if path exists and is not empty
+        if self._is_non_empty_dir(unzip_path):
             print(f"Skipping as unzip path exists and is not empty: {unzip_path}")
         else:
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -280,6 +706,21 @@ class DataDownloader:
         if flatten_directory:
             self._flatten_directory(unzip_path, dataset_name, subfolder_name)
 
+    @staticmethod
+    def _is_non_empty_dir(path: str) -> bool:
+        """
+        Checks whether a directory exists and contains at least one entry, using a single
+        directory listing rather than separate exists and listdir calls.
+
+        :param path: Path of the directory to check.
+        :return: True if the directory exists and is not empty.
+        """
+        try:
+            with os.scandir(path) as entries:
+                return next(entries, None) is not None
+        except (FileNotFoundError, NotADirectoryError):
+            return False
+
     def _flatten_directory(self, directory_path: str, dataset_name: str = None, subfolder_name: str = None) -> None:
         """
         Helper method to flatten a directory by moving all contents from a subdirectory up one level.
@@ -297,12 +738,14 @@ class DataDownloader:
         if dataset_name is not None:
             # Check for specific folder based on dataset or subfolder name
             candidate = os.path.join(directory_path, subfolder_name if subfolder_name else dataset_name)
-            if os.path.exists(candidate) and os.path.isdir(candidate):
+            if os.path.isdir(candidate):
                 folder_to_flatten = candidate
                 folder_name = subfolder_name if subfolder_name else dataset_name
         else:
             # Check for a single subdirectory when extracting to root
-            subdirs = [d for d in os.listdir(directory_path) if os.path.isdir(os.path.join(directory_path, d))]
+            # scandir provides the entry type without a separate stat per entry
+            with os.scandir(directory_path) as entries:
+                subdirs = [entry.name for entry in entries if entry.is_dir()]
             if len(subdirs) == 1:
                 folder_to_flatten = os.path.join(directory_path, subdirs[0])
                 folder_name = subdirs[0]
@@ -339,8 +782,8 @@ class DataDownloader:
         :param source_directory: The directory to scan for files matching the patterns.
         :param destination_directory: The target directory to which the matched files will be moved.
         """
-        if not os.path.exists(destination_directory):
-            os.makedirs(destination_directory)
+        if not os.path.isdir(destination_directory):
+            os.makedirs(destination_directory, exist_ok=True)
             print(f'Making destination directory {destination_directory}')
 
         # Find and move files matching the patterns
@@ -0,0 +1,37 @@
+"""
+Shared file helpers for the processing scripts.
+
+Some of the processing steps are slow and their outputs are only intermediate files, so
+the scripts use these helpers to skip a step whose output is already up to date.
+"""
+import os
+
+# Files that make up a shapefile alongside the .shp
+SHAPEFILE_SIDECAR_EXTENSIONS = ('.shx', '.dbf', '.prj', '.cpg')
+
+
+def is_up_to_date(output_path: str, input_paths: list, script_path: str) -> bool:
+    """
+    Return True if the output exists and is newer than all the inputs, so the script
+    doesn't need to be rerun. The script itself is treated as an input, and for a
+    shapefile its .shx, .dbf, .prj and .cpg files are checked too, as editing the
+    attributes only changes the .dbf.
+
+    :param output_path: Path to the output file of the script.
+    :param input_paths: Paths to the input files of the script.
+    :param script_path: Path to the script, normally its __file__.
+    :return: True if the output is newer than the script and all its inputs.
+    """
+    if not os.path.exists(output_path):
+        return False
+    input_files = [script_path]
+    for path in input_paths:
+        if not os.path.exists(path):
+            return False
+        input_files.append(path)
+        stem, ext = os.path.splitext(path)
+        if ext.lower() == '.shp':
+            input_files.extend(f for f in (stem + sidecar for sidecar in SHAPEFILE_SIDECAR_EXTENSIONS)
+                               if os.path.exists(f))
+    output_mtime = os.path.getmtime(output_path)
+    return all(os.path.getmtime(f) <= output_mtime for f in input_files)